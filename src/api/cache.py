@@ -0,0 +1,98 @@
+"""
+Disk-backed response cache for Gemini analyses.
+"""
+
+import asyncio
+import hashlib
+import os
+from typing import Optional
+
+DEFAULT_CACHE_DIR = os.path.join("~", ".cache", "resume-analyzer")
+
+
+def get_cache_dir() -> str:
+    """
+    Get the cache directory, honouring the RESUME_ANALYZER_CACHE_DIR override.
+
+    Returns:
+        Absolute path of the cache directory
+    """
+    return os.path.expanduser(
+        os.environ.get("RESUME_ANALYZER_CACHE_DIR", DEFAULT_CACHE_DIR)
+    )
+
+
+def cache_enabled() -> bool:
+    """
+    Check whether the cache is in use; setting RESUME_ANALYZER_NO_CACHE turns it off.
+
+    Returns:
+        False if RESUME_ANALYZER_NO_CACHE is set to a non-empty value
+    """
+    return not os.environ.get("RESUME_ANALYZER_NO_CACHE")
+
+
+def make_cache_key(*parts: str) -> str:
+    """
+    Build a cache key from the given parts.
+
+    Args:
+        parts: Values that together identify a cached result
+
+    Returns:
+        Hex SHA-256 digest of the joined parts
+    """
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(get_cache_dir(), f"{key}.json")
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write(path: str, value: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temporary file first so concurrent readers never see partial JSON
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(value)
+    os.replace(tmp_path, path)
+
+
+async def read_cache(key: str) -> Optional[str]:
+    """
+    Read a cached value.
+
+    Args:
+        key: Cache key
+
+    Returns:
+        Cached JSON string or None on a miss or when the cache is disabled
+    """
+    if not cache_enabled():
+        return None
+    return await asyncio.to_thread(_read, _cache_path(key))
+
+
+async def write_cache(key: str, value: str) -> None:
+    """
+    Store a value in the cache.
+
+    Args:
+        key: Cache key
+        value: JSON string to store
+    """
+    if not cache_enabled():
+        return
+    try:
+        await asyncio.to_thread(_write, _cache_path(key), value)
+    except OSError:
+        # Caching is best-effort; a read-only or full disk must not fail the run
+        pass
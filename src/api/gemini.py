@@ -1,12 +1,100 @@
+import asyncio
+from typing import List, Optional
+
+import httpx
 from google import genai
-from google.genai import types
+from google.genai import errors, types
+from rich import print as rprint
+from tenacity import (
+    RetryCallState,
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
 
+from api.cache import make_cache_key, read_cache, write_cache
 from api.models import Candidate
-from api.prompts import SYSTEM_PROMPT, USER_PROMPT
+from api.prompts import BATCH_PROMPT_TEMPLATE, SYSTEM_PROMPT, USER_PROMPT_TEMPLATE
 
 from aiohttp import ClientSession
 
-async def verify_gemini_api_key(api_key):
+_exponential_wait = wait_exponential_jitter(initial=1, max=30)
+
+
+def _is_retryable_error(error: BaseException) -> bool:
+    """
+    Check whether a Gemini request failure is transient and worth retrying.
+    """
+    if isinstance(error, errors.APIError):
+        return error.code == 429 or error.code >= 500
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+
+def _server_retry_delay(error: errors.APIError) -> Optional[float]:
+    """
+    Read the delay Gemini asks for in the RetryInfo detail of a 429 response.
+    """
+    if not isinstance(error.details, dict):
+        return None
+    for detail in error.details.get("error", {}).get("details", []):
+        if str(detail.get("@type", "")).endswith("RetryInfo"):
+            try:
+                return float(str(detail.get("retryDelay", "")).rstrip("s"))
+            except ValueError:
+                return None
+    return None
+
+
+def _wait_for_retry(retry_state: RetryCallState) -> float:
+    """
+    Honour Gemini's suggested retry delay on 429 responses, otherwise back off
+    exponentially with jitter.
+    """
+    error = retry_state.outcome.exception() if retry_state.outcome else None
+    if isinstance(error, errors.APIError) and error.code == 429:
+        delay = _server_retry_delay(error)
+        if delay is not None:
+            return delay
+    return _exponential_wait(retry_state)
+
+
+def _log_retry(retry_state: RetryCallState) -> None:
+    """
+    Report a failed attempt before sleeping for the next one.
+    """
+    error = retry_state.outcome.exception()
+    delay = retry_state.next_action.sleep if retry_state.next_action else 0
+    rprint(
+        f"\n[bold red]Gemini request failed: {str(error)}[/bold red]"
+        f"\n[bold yellow]Retrying in {delay:.1f}s...[/bold yellow]"
+    )
+
+
+@retry(
+    stop=stop_after_attempt(5),
+    wait=_wait_for_retry,
+    retry=retry_if_exception(_is_retryable_error),
+    before_sleep=_log_retry,
+    reraise=True,
+)
+async def _generate_content(
+    client: genai.Client,
+    model: str,
+    contents: str,
+    config: types.GenerateContentConfig,
+) -> types.GenerateContentResponse:
+    """
+    Call Gemini, retrying rate limits and transient server or network errors.
+    """
+    return await client.aio.models.generate_content(
+        model=model,
+        contents=contents,
+        config=config,
+    )
+
+
+async def verify_gemini_api_key(api_key, session: Optional[ClientSession] = None):
     API_VERSION = 'v1'
     api_url = f'https://generativelanguage.googleapis.com/{API_VERSION}/models'
     
@@ -15,12 +103,39 @@ async def verify_gemini_api_key(api_key):
         'x-goog-api-key': api_key,
     }
     
-    async with ClientSession() as session:
-        async with session.get(api_url, headers=headers) as response:
-            if response.status != 200:
-                error_message = (await response.json()).get('error', {}).get('message', 'Invalid API key')
-                raise Exception(error_message)
-            return True
+    # Reuse the caller's connection pool when one is provided
+    if session is None:
+        async with ClientSession() as own_session:
+            return await verify_gemini_api_key(api_key, session=own_session)
+
+    async with session.get(api_url, headers=headers) as response:
+        # Raises aiohttp.ClientResponseError without reading the body
+        response.raise_for_status()
+        return True
+
+def _make_cache_key(
+    cv_text: str, jd_text: str, model: str, temperature: float, batch: bool = False
+) -> Optional[str]:
+    # Only deterministic requests are worth caching
+    if temperature != 0:
+        return None
+    # A CV analysed inside a batch saw a different prompt than one analysed alone
+    prompts = [SYSTEM_PROMPT, USER_PROMPT_TEMPLATE.template]
+    if batch:
+        prompts.append(BATCH_PROMPT_TEMPLATE.template)
+    return make_cache_key(model, str(temperature), *prompts, cv_text, jd_text)
+
+
+async def _read_cached_candidate(cache_key: str) -> Optional[Candidate]:
+    cached = await read_cache(cache_key)
+    if cached:
+        try:
+            return Candidate.model_validate_json(cached)
+        except ValueError:
+            # Stale or corrupt entry, fall through and refresh it
+            pass
+    return None
+
 
 async def get_candidate_info(
     cv_text: str,
@@ -31,8 +146,16 @@ async def get_candidate_info(
 ) -> Candidate:
     """
     Get candidate information from Gemini.
+
+    Deterministic requests (temperature 0) are served from the on-disk cache when
+    the same CV and JD were analysed before with the same model.
     """
-    
+    cache_key = _make_cache_key(cv_text, jd_text, model, temperature)
+    if cache_key:
+        cached = await _read_cached_candidate(cache_key)
+        if cached:
+            return cached
+
     config = types.GenerateContentConfig(
         response_mime_type="application/json",
         response_schema=Candidate,
@@ -40,15 +163,77 @@ async def get_candidate_info(
         system_instruction=SYSTEM_PROMPT,
     )
 
-    contents = USER_PROMPT.format(
+    contents = USER_PROMPT_TEMPLATE.substitute(
         cv_text=cv_text,
         jd_text=jd_text,
     )
 
-    response = await client.aio.models.generate_content(
-        model=model,
-        contents=contents,
-        config=config,
+    response = await _generate_content(client, model, contents, config)
+
+    candidate = response.parsed
+    if cache_key and isinstance(candidate, Candidate):
+        await write_cache(cache_key, candidate.model_dump_json())
+
+    return candidate
+
+
+async def get_candidates_info_batch(
+    cv_texts: List[str],
+    jd_text: str,
+    client: genai.Client,
+    model: str,
+    temperature: float,
+) -> List[Candidate]:
+    """
+    Get candidate information for several CVs against the same JD in one Gemini request.
+
+    CVs cached from an earlier batch are answered from the on-disk cache and left
+    out of the request.
+
+    Raises:
+        ValueError: If the response does not contain one valid candidate per CV
+    """
+    cache_keys = [
+        _make_cache_key(cv_text, jd_text, model, temperature, batch=True)
+        for cv_text in cv_texts
+    ]
+    candidates: List[Optional[Candidate]] = [
+        await _read_cached_candidate(cache_key) if cache_key else None
+        for cache_key in cache_keys
+    ]
+    pending = [index for index, candidate in enumerate(candidates) if candidate is None]
+    if not pending:
+        return candidates
+
+    config = types.GenerateContentConfig(
+        response_mime_type="application/json",
+        response_schema=list[Candidate],
+        temperature=temperature,
+        system_instruction=SYSTEM_PROMPT,
+    )
+
+    numbered_cvs = "\n\n".join(
+        f"[{number}]\n{cv_texts[index]}" for number, index in enumerate(pending, 1)
     )
+    contents = USER_PROMPT_TEMPLATE.substitute(
+        cv_text=numbered_cvs,
+        jd_text=jd_text,
+    ) + BATCH_PROMPT_TEMPLATE.substitute(cv_count=len(pending))
+
+    response = await _generate_content(client, model, contents, config)
+
+    parsed = response.parsed
+    if not isinstance(parsed, list) or len(parsed) != len(pending):
+        raise ValueError(
+            f"Expected {len(pending)} candidates in the batch response, got "
+            f"{len(parsed) if isinstance(parsed, list) else 'none'}"
+        )
+
+    for index, candidate in zip(pending, parsed):
+        if not isinstance(candidate, Candidate):
+            raise ValueError("Batch response contains an invalid candidate")
+        candidates[index] = candidate
+        if cache_keys[index]:
+            await write_cache(cache_keys[index], candidate.model_dump_json())
 
-    return response.parsed
\ No newline at end of file
+    return candidates
@@ -2,25 +2,28 @@
 Data models for the application.
 """
 
-from typing import List, Literal
+from typing import Annotated, List, Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class Candidate(BaseModel):
     """Represents a candidate's profile."""
 
+    # Candidates are never mutated after parsing; frozen makes assignment an error
+    model_config = ConfigDict(frozen=True, str_strip_whitespace=True)
+
     full_name: str
     email: str
     contact_number: str
     linkedin_url: str
     gender: Literal["Male", "Female", "N/A"]
     date_of_birth: str
-    years_of_experience: int = Field(ge=0)
+    years_of_experience: Annotated[int, Field(ge=0)]
     personal_skills: List[str]
     professional_skills: List[str]
     experience_summary: str
-    match_score: int = Field(ge=0, le=100)
+    match_score: Annotated[int, Field(ge=0, le=100)]
     ranking_category: Literal["No Fit", "High Fit", "Medium Fit", "Low Fit"]
     ranking_reason: str
     job_location: str
@@ -1,14 +1,115 @@
+import asyncio
 import mimetypes
 import os
 from datetime import datetime
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, Set
+from zoneinfo import ZoneInfo
 
 import aiohttp
+import httpx
+import orjson
+from aiolimiter import AsyncLimiter
 from notion_client import AsyncClient as NotionClient
+from notion_client.errors import HTTPResponseError, RequestTimeoutError
 from rich import print as rprint
-from pytz import timezone as tzinfo
+from tenacity import (
+    RetryCallState,
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
 from api.models import Candidate
 
+# Notion's documented average rate limit for an integration
+NOTION_REQUESTS_PER_SECOND = 3.0
+
+# Optional text property holding the SHA-256 of the uploaded CV file
+CV_HASH_PROPERTY = "CV Hash"
+
+_exponential_wait = wait_exponential_jitter(initial=1, max=30)
+
+# Notion multi-select option names cannot contain commas
+_COMMA_TRANS = str.maketrans("", "", ",")
+
+
+@lru_cache(maxsize=32)
+def _content_type_for(extension: str) -> str:
+    """
+    Resolve the MIME type for a file extension, falling back to a binary stream.
+    """
+    content_type, _ = mimetypes.guess_type(f"file{extension}")
+    return content_type or "application/octet-stream"
+
+
+def _make_limiter(requests_per_second: float) -> AsyncLimiter:
+    """
+    Build a limiter for the given average request rate.
+
+    Rates of 1/s and above allow a burst of one second's worth of requests; slower
+    rates allow one request per 1/requests_per_second seconds, since an AsyncLimiter
+    whose capacity is below 1 rejects every acquire.
+    """
+    capacity = max(1.0, requests_per_second)
+    return AsyncLimiter(capacity, capacity / requests_per_second)
+
+
+def _json_dumps(obj) -> str:
+    return orjson.dumps(obj).decode()
+
+
+class FileUploadError(Exception):
+    """Raised when Notion rejects a CV file upload request."""
+
+    def __init__(self, message: str, status: Optional[int] = None, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+def _is_retryable_error(error: BaseException) -> bool:
+    """
+    Check whether a Notion request failure is transient and worth retrying.
+    """
+    if isinstance(error, (HTTPResponseError, FileUploadError)):
+        return error.status is not None and (error.status == 429 or error.status >= 500)
+    return isinstance(
+        error,
+        (
+            RequestTimeoutError,
+            aiohttp.ClientError,
+            httpx.TransportError,
+            asyncio.TimeoutError,
+        ),
+    )
+
+
+def _wait_for_retry(retry_state: RetryCallState) -> float:
+    """
+    Honour Notion's Retry-After header on 429 responses, otherwise back off
+    exponentially with jitter.
+    """
+    error = retry_state.outcome.exception() if retry_state.outcome else None
+    if isinstance(error, (HTTPResponseError, FileUploadError)) and error.status == 429:
+        try:
+            return float(error.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            pass
+    return _exponential_wait(retry_state)
+
+
+def _log_retry(retry_state: RetryCallState) -> None:
+    """
+    Report a failed attempt before sleeping for the next one.
+    """
+    error = retry_state.outcome.exception()
+    delay = retry_state.next_action.sleep if retry_state.next_action else 0
+    rprint(
+        f"\n[bold red]Notion request failed: {str(error)}[/bold red]"
+        f"\n[bold yellow]Retrying in {delay:.1f}s...[/bold yellow]"
+    )
+
 
 class NotionManager:
     def __init__(self, token: str, database_id: str, timezone: str = "UTC"):
@@ -21,28 +122,158 @@ class NotionManager:
             timezone: Timezone for date/time formatting (default: UTC)
         """
         self.client = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._email_property_id: Optional[str] = None
+        self._existing_emails: Optional[Set[str]] = None
+        self._cv_hash_property_id: Optional[str] = None
+        self._existing_cv_hashes: Optional[Set[str]] = None
+        self._processing_timestamp: Optional[str] = None
+        self._limiter = _make_limiter(NOTION_REQUESTS_PER_SECOND)
         self.token = token
         self.database_id = database_id
-        self.timezone = tzinfo(timezone) if timezone else None
+        self.timezone = ZoneInfo(timezone) if timezone else None
 
-    async def configure(self):
+    async def configure(
+        self,
+        max_concurrent: int = 3,
+        requests_per_second: float = NOTION_REQUESTS_PER_SECOND,
+    ):
         """
-        Configure the Notion client.
+        Configure the Notion client and the shared HTTP session used for file uploads.
+
+        Args:
+            max_concurrent: Maximum number of concurrent Notion uploads, used to size
+                the connection pool (default: 3)
+            requests_per_second: Maximum rate of Notion API requests across all
+                concurrent uploads (default: 3)
         """
+        # Every Notion request below passes through this limiter
+        self._limiter = _make_limiter(requests_per_second)
+
         self.client = NotionClient(auth=self.token)
+        await self._limiter.acquire()
         await self.client.users.me()
 
-        await self.client.databases.retrieve(database_id=self.database_id)
+        await self._limiter.acquire()
+        database = await self.client.databases.retrieve(database_id=self.database_id)
+        email_property = database.get("properties", {}).get("Email", {})
+        self._email_property_id = email_property.get("id")
+        # CV hashes are only recorded for databases that define the property
+        cv_hash_property = database.get("properties", {}).get(CV_HASH_PROPERTY, {})
+        if cv_hash_property.get("type") == "rich_text":
+            self._cv_hash_property_id = cv_hash_property.get("id")
+
+        # Every candidate in this run shares one processing timestamp
+        self._processing_timestamp = datetime.now(tz=self.timezone).isoformat()
+
+        # Reuse one keep-alive connection pool for every file upload
+        connector = aiohttp.TCPConnector(
+            limit=max_concurrent * 2,
+            limit_per_host=max_concurrent * 2,
+            keepalive_timeout=60,
+            ttl_dns_cache=300,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers={
+                "Authorization": f"Bearer {self.token}",
+                "Notion-Version": "2022-06-28",
+            },
+            json_serialize=_json_dumps,
+        )
 
         return self
 
+    async def aclose(self):
+        """
+        Close the Notion client and the shared HTTP session.
+        """
+        if self.client is not None:
+            await self.client.aclose()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def prefetch_existing_emails(self) -> Set[str]:
+        """
+        Load every candidate email already in the database in a single paginated pass,
+        so duplicate checks become in-memory lookups instead of one query per candidate.
+        CV hashes are collected in the same pass when the database has a CV Hash property.
+
+        Returns:
+            Set of existing candidate emails, lowercased
+        """
+        existing_emails = set()
+        existing_cv_hashes = set()
+        query_params = {"database_id": self.database_id, "page_size": 100}
+        if self._email_property_id:
+            query_params["filter_properties"] = [self._email_property_id]
+            if self._cv_hash_property_id:
+                query_params["filter_properties"].append(self._cv_hash_property_id)
+
+        start_cursor = None
+        while True:
+            if start_cursor:
+                query_params["start_cursor"] = start_cursor
+            await self._limiter.acquire()
+            response = await self.client.databases.query(**query_params)
+
+            for page in response.get("results", []):
+                properties = page.get("properties", {})
+                email = properties.get("Email", {}).get("email")
+                if email:
+                    # Email addresses are compared case-insensitively
+                    existing_emails.add(email.lower())
+                for text in properties.get(CV_HASH_PROPERTY, {}).get("rich_text", []):
+                    existing_cv_hashes.add(text.get("plain_text", ""))
+
+            if not response.get("has_more"):
+                break
+            start_cursor = response.get("next_cursor")
+
+        self._existing_emails = existing_emails
+        if self._cv_hash_property_id:
+            self._existing_cv_hashes = existing_cv_hashes
+        return existing_emails
+
+    async def check_for_hash(self, cv_hash: Optional[str]) -> bool:
+        """
+        Check if a CV file with the given content hash was already uploaded.
+
+        Args:
+            cv_hash: SHA-256 hex digest of the CV file
+
+        Returns:
+            True if the database has a row for this CV file, False otherwise or
+            when the database has no CV Hash property
+        """
+        if not cv_hash or not self._cv_hash_property_id:
+            return False
+
+        if self._existing_cv_hashes is not None:
+            return cv_hash in self._existing_cv_hashes
+
+        try:
+            await self._limiter.acquire()
+            response = await self.client.databases.query(
+                database_id=self.database_id,
+                filter={
+                    "property": CV_HASH_PROPERTY,
+                    "rich_text": {"equals": cv_hash},
+                },
+                page_size=1,
+                filter_properties=[self._cv_hash_property_id],
+            )
+            return len(response.get("results", [])) > 0
+        except Exception as e:
+            rprint(f"\n[bold red]Error checking for duplicate: {str(e)}[/bold red]")
+            return False
+
     async def check_for_duplicate(self, email: str) -> bool:
         """
         Check if a candidate with the given email already exists for this job.
 
         Args:
             email: Candidate's email
-            job_location: Location
 
         Returns:
             True if a duplicate exists, False otherwise
@@ -50,15 +281,23 @@ class NotionManager:
         if not email or email == "N/A":
             return False
 
+        if self._existing_emails is not None:
+            return email.lower() in self._existing_emails
+
         try:
             filter_params = {
                 "filter": {
                     "and": [
                         {"property": "Email", "email": {"equals": email}},
                     ]
-                }
+                },
+                # Existence is all we need, so fetch one row with only its email
+                "page_size": 1,
             }
+            if self._email_property_id:
+                filter_params["filter_properties"] = [self._email_property_id]
 
+            await self._limiter.acquire()
             response = await self.client.databases.query(
                 database_id=self.database_id, **filter_params
             )
@@ -68,7 +307,7 @@ class NotionManager:
             # If there's an error, assume no duplicate to allow creation
             return False
 
-    async def upload_file_to_notion(self, file_path: str) -> Optional[str]:
+    async def upload_file_to_notion(self, file_path: str) -> dict:
         """
         Upload a file to Notion using the two-step process with aiohttp.
 
@@ -76,167 +315,207 @@ class NotionManager:
             file_path: Path to the file to upload
 
         Returns:
-            URL of the uploaded file or None if upload failed
+            Notion file upload object
+
+        Raises:
+            FileUploadError: If Notion rejects either upload request
+            OSError: If the file cannot be read
         """
-        try:
-            # Get file name and size
-            file_name = os.path.basename(file_path)
-            file_size = os.path.getsize(file_path)
+        # Get file name and size
+        file_name = os.path.basename(file_path)
+        file_size = await asyncio.to_thread(os.path.getsize, file_path)
+
+        # Step 1: Create upload request to get upload ID
+        await self._limiter.acquire()
+        async with self._session.post(
+            "https://api.notion.com/v1/file_uploads",
+            json={"name": file_name, "size": file_size},
+        ) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                raise FileUploadError(
+                    f"Failed to initiate file upload: {error_text}",
+                    status=response.status,
+                    headers=response.headers,
+                )
 
-            # Common headers for all Notion API requests
-            headers = {
-                "Authorization": f"Bearer {self.token}",
-                "Notion-Version": "2022-06-28",
-                "Content-Type": "application/json",
-            }
+            upload_data = orjson.loads(await response.read())
+            file_upload_id = upload_data.get("id")
+
+            if not file_upload_id:
+                raise FileUploadError("Failed to get file upload ID from response")
+
+        # Step 2: Upload the file content
+        content_type = _content_type_for(os.path.splitext(file_name)[1].lower())
+
+        # Stream the file from disk instead of buffering it in memory;
+        # aiohttp reads the handle in chunks while sending
+        with open(file_path, "rb") as f:
+            form = aiohttp.FormData()
+            form.add_field("file", f, filename=file_name, content_type=content_type)
+
+            await self._limiter.acquire()
+            async with self._session.post(
+                f"https://api.notion.com/v1/file_uploads/{file_upload_id}/send",
+                data=form,
+            ) as upload_response:
+                if upload_response.status != 200:
+                    error_text = await upload_response.text()
+                    raise FileUploadError(
+                        f"Failed to upload file content: {error_text}",
+                        status=upload_response.status,
+                        headers=upload_response.headers,
+                    )
+
+                return orjson.loads(await upload_response.read())
+
+    def _build_properties(self, candidate: Candidate, file_upload_id: str) -> dict:
+        """
+        Build the Notion page properties for a candidate.
 
-            async with aiohttp.ClientSession() as session:
-                # Step 1: Create upload request to get upload ID
-                async with session.post(
-                    "https://api.notion.com/v1/file_uploads",
-                    headers=headers,
-                    json={"name": file_name, "size": file_size},
-                ) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        rprint(
-                            f"\n[bold red]Failed to initiate file upload: {error_text}[/bold red]"
-                        )
-                        return None
-
-                    upload_data = await response.json()
-                    file_upload_id = upload_data.get("id")
-
-                    if not file_upload_id:
-                        rprint(
-                            "\n[bold red]Failed to get file upload ID from response[/bold red]"
-                        )
-                        return None
-
-                # Step 2: Upload the file content
-                # Remove Content-Type from headers for multipart request
-                upload_headers = {
-                    k: v for k, v in headers.items() if k != "Content-Type"
-                }
+        Args:
+            candidate: Candidate data
+            file_upload_id: ID of the uploaded CV file
 
-                # Determine content type of the file
-                content_type, _ = mimetypes.guess_type(file_path)
-                if not content_type:
-                    content_type = "application/octet-stream"
+        Returns:
+            Notion page properties payload
+        """
+        processing_timestamp = (
+            self._processing_timestamp or datetime.now(tz=self.timezone).isoformat()
+        )
+
+        # Prepare properties with correct CV file handling
+        properties = {
+            "Name": {"title": [{"text": {"content": candidate.full_name}}]},
+            "Email": {"email": candidate.email},
+            "Phone": {"phone_number": candidate.contact_number},
+            "Linkedin": {"url": candidate.linkedin_url},
+            "Gender": {"select": {"name": candidate.gender}},
+            "YOE": {"number": candidate.years_of_experience},
+            "Profile Summary": {
+                "rich_text": [
+                    {"text": {"content": candidate.experience_summary}}
+                ]
+            },
+            "Professional Skills": {
+                "multi_select": [
+                    {"name": skill.translate(_COMMA_TRANS)}
+                    for skill in candidate.professional_skills
+                ]
+            },
+            "Personal Skills": {
+                "multi_select": [
+                    {"name": skill.translate(_COMMA_TRANS)}
+                    for skill in candidate.personal_skills
+                ]
+            },
+            "CV File": {
+                "files": [
+                    {
+                        "type": "file_upload",
+                        "file_upload": {"id": file_upload_id},
+                    }
+                ]
+            },
+            "Position Title": {
+                "select": {"name": candidate.job_position_title}
+            },
+            "Location": {"select": {"name": candidate.job_location}},
+            "Match Score": {"number": candidate.match_score},
+            "Ranking Category": {
+                "select": {"name": candidate.ranking_category}
+            },
+            "AI Ranking Reason": {
+                "rich_text": [{"text": {"content": candidate.ranking_reason}}]
+            },
+            "Processing Date": {"date": {"start": processing_timestamp}},
+            "Status": {"status": {"name": "Processed by AI"}},
+        }
+
+        if candidate.date_of_birth != "N/A":
+            properties["DOB"] = {"date": {"start": candidate.date_of_birth}}
+
+        return properties
+
+    @retry(
+        stop=stop_after_attempt(5),
+        wait=_wait_for_retry,
+        retry=retry_if_exception(_is_retryable_error),
+        before_sleep=_log_retry,
+        reraise=True,
+    )
+    async def _upload_cv_file(self, cv_filepath: str) -> dict:
+        """
+        Upload the CV file, retrying rate limits, server errors and transport
+        failures with exponential backoff. Client errors and unreadable files fail
+        on the first attempt.
 
-                with open(file_path, "rb") as f:
-                    file_content = f.read()
+        Args:
+            cv_filepath: Path to the CV file
 
-                form = aiohttp.FormData()
-                form.add_field(
-                    "file", file_content, filename=file_name, content_type=content_type
-                )
+        Returns:
+            Notion file upload object
+        """
+        return await self.upload_file_to_notion(cv_filepath)
+
+    @retry(
+        stop=stop_after_attempt(5),
+        wait=_wait_for_retry,
+        retry=retry_if_exception(_is_retryable_error),
+        before_sleep=_log_retry,
+        reraise=True,
+    )
+    async def _create_page(self, properties: dict) -> str:
+        """
+        Create a page in the database, retrying transient failures with exponential
+        backoff.
 
-                async with session.post(
-                    f"https://api.notion.com/v1/file_uploads/{file_upload_id}/send",
-                    headers=upload_headers,
-                    data=form,
-                ) as upload_response:
-                    if upload_response.status != 200:
-                        error_text = await upload_response.text()
-                        rprint(
-                            f"\n[bold red]Failed to upload file content: {error_text}[/bold red]"
-                        )
-                        return None
-
-                    result = await upload_response.json()
-                    return result
+        Args:
+            properties: Notion page properties payload
 
-        except Exception as e:
-            rprint(f"\n[bold red]Error uploading file to Notion: {str(e)}[/bold red]")
-            return None
+        Returns:
+            ID of the created row
+        """
+        await self._limiter.acquire()
+        response = await self.client.pages.create(
+            parent={"database_id": self.database_id}, properties=properties
+        )
+        return response["id"]
 
     async def create_candidate_row(
-        self, candidate: Candidate, cv_filepath: str
+        self, candidate: Candidate, cv_filepath: str, cv_hash: Optional[str] = None
     ) -> Optional[str]:
         """
         Create a new row in the Notion database table for the candidate.
 
+        The CV is uploaded and the properties are built once; only the failing
+        request is retried, so a successful upload is never repeated.
+
         Args:
             candidate: Candidate data
             cv_filepath: Path to the CV file
-            position_title: Position title from JD
-            job_location: Job Location from JD
+            cv_hash: Optional SHA-256 of the CV file, stored when the database
+                has a CV Hash property
 
         Returns:
             ID of the created row or None if creation failed
         """
-        attempts = 0
-        max_attempts = 5
-        while attempts < max_attempts:
-            try:
-                # Upload the file and get response
-                file_upload = await self.upload_file_to_notion(cv_filepath)
-
-                # Prepare properties with correct CV file handling
-                properties = {
-                    "Name": {"title": [{"text": {"content": candidate.full_name}}]},
-                    "Email": {"email": candidate.email},
-                    "Phone": {"phone_number": candidate.contact_number},
-                    "Linkedin": {"url": candidate.linkedin_url},
-                    "Gender": {"select": {"name": candidate.gender}},
-                    "YOE": {"number": candidate.years_of_experience},
-                    "Profile Summary": {
-                        "rich_text": [
-                            {"text": {"content": candidate.experience_summary}}
-                        ]
-                    },
-                    "Professional Skills": {
-                        "multi_select": [
-                            {"name": skill.replace(",", "")}
-                            for skill in candidate.professional_skills
-                        ]
-                    },
-                    "Personal Skills": {
-                        "multi_select": [
-                            {"name": skill.replace(",", "")}
-                            for skill in candidate.personal_skills
-                        ]
-                    },
-                    "CV File": {
-                        "files": [
-                            {
-                                "type": "file_upload",
-                                "file_upload": {"id": file_upload.get("id")},
-                            }
-                        ]
-                    },
-                    "Position Title": {
-                        "select": {"name": candidate.job_position_title}
-                    },
-                    "Location": {"select": {"name": candidate.job_location}},
-                    "Match Score": {"number": candidate.match_score},
-                    "Ranking Category": {
-                        "select": {"name": candidate.ranking_category}
-                    },
-                    "AI Ranking Reason": {
-                        "rich_text": [{"text": {"content": candidate.ranking_reason}}]
-                    },
-                    "Processing Date": {"date": {"start": datetime.now(tz=self.timezone).isoformat()}},
-                    "Status": {"status": {"name": "Processed by AI"}},
+        try:
+            file_upload = await self._upload_cv_file(cv_filepath)
+            properties = self._build_properties(candidate, file_upload.get("id"))
+            if cv_hash and self._cv_hash_property_id:
+                properties[CV_HASH_PROPERTY] = {
+                    "rich_text": [{"text": {"content": cv_hash}}]
                 }
+            page_id = await self._create_page(properties)
+        except Exception as e:
+            rprint(f"\n[bold red]Error creating Notion table row: {str(e)}[/bold red]")
+            return None
 
-                if candidate.date_of_birth != "N/A":
-                    properties["DOB"] = {"date": {"start": candidate.date_of_birth}}
-
-                # Create a new row in the table
-                response = await self.client.pages.create(
-                    parent={"database_id": self.database_id}, properties=properties
-                )
-
-                return response["id"]
+        # Keep the prefetched emails current so later CVs in this run are caught
+        if self._existing_emails is not None and candidate.email != "N/A":
+            self._existing_emails.add(candidate.email.lower())
+        if self._existing_cv_hashes is not None and cv_hash:
+            self._existing_cv_hashes.add(cv_hash)
 
-            except Exception as e:
-                rprint(
-                    f"\n[bold red]Error creating Notion table row: {str(e)}[/bold red]"
-                )
-                attempts += 1
-                if attempts < max_attempts:
-                    rprint("\n[bold yellow]Retrying...[/bold yellow]")
-                else:
-                    return None
+        return page_id
@@ -1,3 +1,5 @@
+from string import Template
+
 SYSTEM_PROMPT = """
 You are an expert AI Recruitment Analyzer. Your task is to meticulously parse the
 provided Candidate CV and Job Description (JD). First, extract key information from the CV. Then,
@@ -14,10 +16,10 @@ a concise but thorough **reasoning** for your assessment. Finally, return all in
 single, valid JSON object.
 
 **Candidate CV Text:**
-{cv_text}
+$cv_text
 
 **Job Description (JD) Text (Key details like Position Title and Job Country are provided for context):**
-{jd_text}
+$jd_text
 
 **Instructions & Output Format:**
 Based on the CV and JD provided above, perform the following:
@@ -72,7 +74,7 @@ as well as any significant gaps or areas where the candidate does not meet the J
 
 **Required Output Format (for CV-JD matching):**
 Return your complete analysis as a single, valid JSON object. Do not include any explanatory text
-or headers outside of this JSON object.```json {{
+or headers outside of this JSON object.```json {
 "full_name": "string_or_N/A",
 "email": "string_or_N/A", 
 "contact_number": "string_or_N/A",
@@ -88,6 +90,20 @@ or headers outside of this JSON object.```json {{
 "ranking_reason": "string_detailed_explanation_and_reasoning",
 "job_location": "string_job_location",
 "job_position_title": "string_job_position_title"
-}}
+}
 Please ensure all string values within the JSON are properly escaped if necessary.
 """
+
+# Parsed once at import; substituted per CV
+USER_PROMPT_TEMPLATE = Template(USER_PROMPT)
+
+BATCH_PROMPT = """
+
+**Multiple CVs:**
+The Candidate CV Text above contains $cv_count separate CVs, each starting with its number in
+square brackets ([1], [2], ...). Apply the instructions above to each CV on its own, against the
+same JD. Return a JSON array with exactly $cv_count objects in the same order as the CVs, each in
+the required output format, instead of a single object.
+"""
+
+BATCH_PROMPT_TEMPLATE = Template(BATCH_PROMPT)
@@ -10,9 +10,9 @@ from rich import print as rprint
 from rich.console import Console
 from rich.panel import Panel
 
-from commands.process import process_command
-
 # Import command modules
+# commands.process is imported inside process() so other commands skip loading
+# the Gemini and Notion SDKs
 from commands.setup import setup_command
 
 # Create Typer app
@@ -88,10 +88,24 @@ def process(
         "-nc",
         help="Maximum number of concurrent Notion uploads",
     ),
+    notion_rps: float = typer.Option(
+        3.0,
+        "--notion-rps",
+        "-nr",
+        help="Maximum number of Notion API requests per second",
+    ),
+    gemini_batch_size: int = typer.Option(
+        1,
+        "--gemini-batch-size",
+        "-gb",
+        help="Number of CVs analyzed per Gemini API request",
+    ),
 ):
     """
     Processes resumes for multiple job positions based on a structured folder layout.
     """
+    from commands.process import process_command
+
     # Run the process command asynchronously
     # try:
     asyncio.run(
@@ -104,6 +118,8 @@ def process(
             gemini_temperature=gemini_temperature,
             max_gemini_concurrent=max_gemini_concurrent,
             max_notion_concurrent=max_notion_concurrent,
+            notion_rps=notion_rps,
+            gemini_batch_size=gemini_batch_size,
             timezone=timezone,
             console=console,
         )
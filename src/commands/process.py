@@ -2,26 +2,47 @@
 Process command for Resume Analyzer Agent
 """
 
+import asyncio
+import multiprocessing
 import os
-from typing import Optional, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Set
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import glob
 
-import pytz
+import aiohttp
+import httpx
 import typer
 from google import genai
+from google.genai import types
 from rich import print as rprint
 from rich.console import Console
+from rich.markup import escape
 from rich.panel import Panel
 
 from api.gemini import verify_gemini_api_key
 from api.notion import NotionManager
 from config.config import get_config
-from core.extraction import extract_cv_text
-from core.gemini_processing import process_with_gemini
-from core.notion_upload import upload_to_notion
-from misc.file_processor import extract_text_from_pdf, format_cv_files, get_cv_files
+from core.extraction import drop_identical_texts, extract_cv_text
+from core.notion_upload import skip_known_duplicates
+from core.pipeline import process_cvs
+from misc.file_processor import (
+    EXTRACTION_CACHE_DIR,
+    JD_EXTENSIONS,
+    append_processed_files,
+    format_cv_files,
+    get_cv_files,
+    get_jd_text_cached,
+    hash_file,
+    load_cv_hashes,
+    load_processed_files,
+    save_cv_hashes,
+)
 from misc.utils import format_processing_stats
 
+# Each position folder keeps its CVs in a subfolder with this name
+CV_FOLDER_NAME = "CVs"
+
 
 async def process_command(
     jobs_folder: str,
@@ -32,6 +53,8 @@ async def process_command(
     gemini_temperature: Optional[float],
     max_gemini_concurrent: Optional[int] = 5,
     max_notion_concurrent: Optional[int] = 3,
+    notion_rps: Optional[float] = 3.0,
+    gemini_batch_size: Optional[int] = 1,
     timezone: Optional[str] = None,
     console: Console = Console(),
 ):
@@ -47,6 +70,8 @@ async def process_command(
         gemini_temperature: Gemini Temperature (overrides .env)
         max_gemini_concurrent: Maximum number of concurrent Gemini API calls (default: 5)
         max_notion_concurrent: Maximum number of concurrent Notion uploads (default: 3)
+        notion_rps: Maximum number of Notion API requests per second (default: 3)
+        gemini_batch_size: Number of CVs analyzed per Gemini API request (default: 1)
         timezone: Timezone for date/time formatting (overrides .env)
         console: Rich console for display
 
@@ -69,11 +94,11 @@ async def process_command(
         raise typer.Exit(code=1)
 
     # Initialize overall statistics
-    overall_total_files = 0
-    overall_processed_files = 0
-    overall_successful_uploads = 0
-    overall_duplicate_uploads = 0
-    overall_failed_uploads = 0
+    overall_total_files: int = 0
+    overall_processed_files: int = 0
+    overall_successful_uploads: int = 0
+    overall_duplicate_uploads: int = 0
+    overall_failed_uploads: int = 0
     all_failed_files: List[str] = []
     all_duplicate_files: List[str] = []
 
@@ -96,26 +121,56 @@ async def process_command(
 
     # Verify timezone
     try:
-        pytz.timezone(config["TIMEZONE"])
-    except pytz.exceptions.UnknownTimeZoneError:
+        ZoneInfo(config["TIMEZONE"])
+    except (ZoneInfoNotFoundError, ValueError):
         rprint(f"[bold red]Invalid timezone:[/bold red] {config['TIMEZONE']}")
         raise typer.Exit(code=1)
     
     # Initialize clients
     try:
         await verify_gemini_api_key(config["GEMINI_API_KEY"])
-        gemini_client = genai.Client(api_key=config["GEMINI_API_KEY"])
+        # HTTP/2 lets concurrent Gemini calls multiplex over one connection; the
+        # SDK keeps this httpx client (and its keep-alive pool) for its lifetime
+        gemini_client = genai.Client(
+            api_key=config["GEMINI_API_KEY"],
+            http_options=types.HttpOptions(
+                async_client_args={
+                    "http2": True,
+                    "limits": httpx.Limits(
+                        max_connections=max_gemini_concurrent * 2,
+                        max_keepalive_connections=max_gemini_concurrent * 2,
+                        keepalive_expiry=60,
+                    ),
+                }
+            ),
+        )
+    except aiohttp.ClientResponseError as e:
+        if e.status in (400, 401, 403):
+            rprint("[bold red]Error initializing Gemini client:[/bold red] Invalid Gemini API key")
+        else:
+            rprint(
+                f"[bold red]Error initializing Gemini client:[/bold red] Gemini API returned HTTP {e.status} ({e.message})"
+            )
+        raise typer.Exit(code=1)
     except Exception as e:
         rprint(f"[bold red]Error initializing Gemini client:[/bold red] {str(e)}")
         raise typer.Exit(code=1)
 
+    notion_manager = None
     try:
-        notion_manager = await NotionManager(
+        notion_manager = NotionManager(
             token=config["NOTION_API_KEY"],
             database_id=config["NOTION_DATABASE_ID"],
             timezone=config["TIMEZONE"],
-        ).configure()
+        )
+        await notion_manager.configure(
+            max_concurrent=max_notion_concurrent, requests_per_second=notion_rps
+        )
+        await notion_manager.prefetch_existing_emails()
     except Exception as e:
+        # Close whatever connections configure opened before it failed
+        if notion_manager is not None:
+            await notion_manager.aclose()
         rprint(f"[bold red]Error initializing Notion client:[/bold red] {str(e)}")
         raise typer.Exit(code=1)
 
@@ -125,136 +180,216 @@ async def process_command(
         )
         raise typer.Exit(code=1)
 
-    processed_log_file = ".processed_files.log"
-    
-    # Traverse the jobs folder
-    for root, dirs, files in os.walk(jobs_folder):
-        if "CVs" in dirs:
-            cv_folder = os.path.join(root, "CVs")
+    # Entries from the run-wide log used by earlier versions still apply to every position
+    legacy_processed_files = load_processed_files(os.getcwd())
+
+    # Parse CVs on all cores while the event loop keeps API requests in flight.
+    # Workers are spawned rather than forked: by now this process runs the
+    # progress-refresh thread and holds open connection pools.
+    extraction_pool = ProcessPoolExecutor(
+        max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("spawn")
+    )
+
+    try:
+        # Traverse the jobs folder
+        for root, dirs, files in os.walk(jobs_folder):
+            # Dot-folders such as .extraction_cache hold caches, never positions
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            if CV_FOLDER_NAME in dirs:
+                cv_folder = os.path.join(root, CV_FOLDER_NAME)
+                # The CVs are listed below; stop os.walk from listing the folder again
+                dirs.remove(CV_FOLDER_NAME)
             
-            # Find JD file in the current root (position folder)
-            jd_files_in_folder = [f for f in files if f.lower().endswith(".pdf")]
+                # Find JD file in the current root (position folder)
+                jd_files_in_folder = [
+                    f for f in files if os.path.splitext(f)[1].lower() in JD_EXTENSIONS
+                ]
+
+                jd_file = None
+                if len(jd_files_in_folder) == 1:
+                    jd_name = jd_files_in_folder[0]
+                    jd_file = os.path.join(root, jd_name)
+                elif len(jd_files_in_folder) > 1:
+                    rprint(
+                        f"\n[bold yellow]Warning:[/bold yellow] Multiple PDF files found in '{root}'. Skipping this position as JD cannot be determined."
+                    )
+                    continue
+                else:
+                    rprint(
+                        f"\n[bold yellow]Warning:[/bold yellow] No PDF (JD) file found in '{root}'. Skipping this position."
+                    )
+                    continue
 
-            jd_file = None
-            if len(jd_files_in_folder) == 1:
-                jd_file = os.path.join(root, jd_files_in_folder[0])
-            elif len(jd_files_in_folder) > 1:
                 rprint(
-                    f"\n[bold yellow]Warning:[/bold yellow] Multiple PDF files found in '{root}'. Skipping this position as JD cannot be determined."
+                    Panel(
+                        f"[bold blue]Processing Position:[/bold blue] {os.path.basename(root)}\n"
+                        f"JD: {jd_name}\n"
+                        f"CVs Folder: {CV_FOLDER_NAME}",
+                        title="Current Position",
+                        expand=False,
+                    )
                 )
-                continue
-            else:
-                rprint(
-                    f"\n[bold yellow]Warning:[/bold yellow] No PDF (JD) file found in '{root}'. Skipping this position."
-                )
-                continue
 
-            rprint(
-                Panel(
-                    f"[bold blue]Processing Position:[/bold blue] {os.path.basename(root)}\n"
-                    f"JD: {os.path.basename(jd_file)}\n"
-                    f"CVs Folder: {os.path.basename(cv_folder)}",
-                    title="Current Position",
-                    expand=False,
-                )
-            )
-
-            # Process JD file
-            with console.status(f"[bold green]Processing Job Description: {os.path.basename(jd_file)}...[/bold green]"):
-                try:
-                    jd_text = extract_text_from_pdf(jd_file)
-                    rprint(f"[bold green]✓[/bold green] Job Description '{os.path.basename(jd_file)}' processed")
-                except Exception as e:
-                    rprint(f"[bold red]Error processing Job Description '{os.path.basename(jd_file)}':[/bold red] {str(e)}")
+                # Process JD file
+                with console.status(f"[bold green]Processing Job Description: {jd_name}...[/bold green]"):
+                    try:
+                        jd_text = await asyncio.get_running_loop().run_in_executor(
+                            extraction_pool, get_jd_text_cached, jd_file
+                        )
+                        rprint(f"[bold green]✓[/bold green] Job Description '{jd_name}' processed")
+                    except Exception as e:
+                        rprint(f"[bold red]Error processing Job Description '{jd_name}':[/bold red] {str(e)}")
+                        continue # Skip to next position
+
+                # Get CV files, with their names computed once
+                cv_files = format_cv_files(get_cv_files(cv_folder))
+                current_total_files = len(cv_files)
+                overall_total_files += current_total_files
+
+                # Read processed files for this position
+                processed_files_set = load_processed_files(root) | legacy_processed_files
+
+                # Filter out already processed files
+                unprocessed_cv_files = [
+                    cv_file for cv_file in cv_files if cv_file["file_name"] not in processed_files_set
+                ]
+                skipped_files_count = len(cv_files) - len(unprocessed_cv_files)
+
+                if skipped_files_count > 0:
+                    rprint(
+                        f"[bold yellow]Skipping {skipped_files_count} files that have already been processed for this position.[/bold yellow]"
+                    )
+
+                if not unprocessed_cv_files:
+                    rprint(
+                        f"[bold yellow]No new CV files to process for this position in {CV_FOLDER_NAME}[/bold yellow]"
+                    )
                     continue # Skip to next position
 
-            # Get CV files
-            cv_files = get_cv_files(cv_folder)
-            current_total_files = len(os.listdir(cv_folder))
-            overall_total_files += current_total_files
-
-            # Read processed files
-            if os.path.exists(processed_log_file):
-                with open(processed_log_file, "r") as f:
-                    processed_files_set = set(f.read().splitlines())
-            else:
-                processed_files_set = set()
-
-            # Filter out already processed files
-            unprocessed_cv_files = [
-                file for file in cv_files if os.path.basename(file) not in processed_files_set
-            ]
-            skipped_files_count = len(cv_files) - len(unprocessed_cv_files)
-
-            if skipped_files_count > 0:
-                rprint(
-                    f"[bold yellow]Skipping {skipped_files_count} files that have already been processed for this position.[/bold yellow]"
-                )
+                current_processed_files = len(unprocessed_cv_files)
+                overall_processed_files += current_processed_files
+
+                # Skip files whose exact bytes were already uploaded, possibly under another name
+                cv_hashes = load_cv_hashes(root)
+                seen_hashes: Set[str] = set(cv_hashes)
+                file_hashes: Dict[str, str] = {}
+                identical_files: List[str] = []
+                readable_cv_files: List[Dict[str, Any]] = []
+                for cv_file in unprocessed_cv_files:
+                    try:
+                        file_hash = hash_file(cv_file["file_path"])
+                    except OSError as e:
+                        # One unreadable file must not abort the rest of the run
+                        rprint(
+                            f"\n[bold red]Error reading {escape(cv_file['file_name'])}: {escape(str(e))}[/bold red]"
+                        )
+                        overall_failed_uploads += 1
+                        all_failed_files.append(f"{cv_file['file_name']} [unreadable file]")
+                        continue
+                    if file_hash in seen_hashes:
+                        identical_files.append(cv_file["file_name"])
+                    else:
+                        seen_hashes.add(file_hash)
+                        file_hashes[cv_file["file_name"]] = file_hash
+                        cv_file["hash"] = file_hash
+                        readable_cv_files.append(cv_file)
+
+                if identical_files:
+                    rprint(
+                        f"[bold yellow]Skipping {len(identical_files)} files identical to CVs already uploaded for this position.[/bold yellow]"
+                    )
+                    overall_duplicate_uploads += len(identical_files)
+                    all_duplicate_files.extend(identical_files)
+                    # Log them so later runs skip them without hashing them again
+                    append_processed_files(root, identical_files)
+
+                unprocessed_cv_files = readable_cv_files
+                if not unprocessed_cv_files:
+                    continue # Skip to next position
 
-            if not unprocessed_cv_files:
-                rprint(
-                    f"[bold yellow]No new CV files to process for this position in {os.path.basename(cv_folder)}[/bold yellow]"
+                # PHASE 1: Extract text from all CVs
+                cv_data = await extract_cv_text(
+                    unprocessed_cv_files,
+                    console,
+                    executor=extraction_pool,
+                    cache_dir=os.path.join(root, EXTRACTION_CACHE_DIR),
                 )
-                continue # Skip to next position
-
-            current_processed_files = len(unprocessed_cv_files)
-            overall_processed_files += current_processed_files
-
-            # Format CV files for processing
-            formatted_cv_files = format_cv_files(unprocessed_cv_files)
 
-            # PHASE 1: Extract text from all CVs
-            cv_data = await extract_cv_text(formatted_cv_files, console)
+                # Empty, scanned or unreadable CVs never reach Gemini; report them as failed
+                extracted_file_names = {cv_item["file_name"] for cv_item in cv_data}
+                unreadable_files = [
+                    f"{cv_file['file_name']} [no text extracted]"
+                    for cv_file in unprocessed_cv_files
+                    if cv_file["file_name"] not in extracted_file_names
+                ]
+                overall_failed_uploads += len(unreadable_files)
+                all_failed_files.extend(unreadable_files)
+
+                if not cv_data:
+                    rprint(
+                        "[bold yellow]No CV content could be extracted from any files for this position[/bold yellow]"
+                    )
+                    continue # Skip to next position
 
-            if not cv_data:
-                rprint(
-                    "[bold yellow]No CV content could be extracted from any files for this position[/bold yellow]"
+                # Different files can still carry the same resume text
+                cv_data, identical_text_files = drop_identical_texts(cv_data)
+                if identical_text_files:
+                    rprint(
+                        f"[bold yellow]Skipping {len(identical_text_files)} files with the same text as another CV for this position.[/bold yellow]"
+                    )
+                    overall_duplicate_uploads += len(identical_text_files)
+                    all_duplicate_files.extend(identical_text_files)
+                    append_processed_files(root, identical_text_files)
+
+                # Skip candidates already in Notion before paying for a Gemini call
+                cv_data, known_duplicate_files = await skip_known_duplicates(
+                    cv_data, notion_manager
                 )
-                continue # Skip to next position
-
-            # PHASE 2: Process with Gemini API
-            candidates = await process_with_gemini(
-                cv_data=cv_data,
-                jd_text=jd_text,
-                gemini_client=gemini_client,
-                model=config["GEMINI_MODEL"],
-                temperature=float(config["TEMPERATURE"]),
-                console=console,
-                max_concurrent=max_gemini_concurrent,
-            )
+                overall_duplicate_uploads += len(known_duplicate_files)
+                all_duplicate_files.extend(known_duplicate_files)
 
-            if not candidates:
-                rprint(
-                    "[bold yellow]No candidates could be processed with Gemini API for this position[/bold yellow]"
+                if not cv_data:
+                    rprint(
+                        "[bold yellow]All candidates for this position are already in Notion[/bold yellow]"
+                    )
+                    continue # Skip to next position
+
+                # PHASE 2: Analyze with Gemini API and upload each candidate to Notion
+                # as soon as its own analysis completes
+                (
+                    successful_files,
+                    duplicate_files,
+                    failed_files,
+                    successful_files_list,
+                    failed_files_list,
+                    duplicate_files_list,
+                ) = await process_cvs(
+                    cv_data=cv_data,
+                    jd_text=jd_text,
+                    gemini_client=gemini_client,
+                    notion_manager=notion_manager,
+                    model=config["GEMINI_MODEL"],
+                    temperature=float(config["TEMPERATURE"]),
+                    console=console,
+                    max_gemini_concurrent=max_gemini_concurrent,
+                    max_notion_concurrent=max_notion_concurrent,
+                    gemini_batch_size=gemini_batch_size,
+                    processed_dir=root,
                 )
-                continue # Skip to next position
-
-            # PHASE 3: Upload to Notion
-            (
-                successful_files,
-                duplicate_files,
-                failed_files,
-                successful_files_list,
-                failed_files_list,
-                duplicate_files_list,
-            ) = await upload_to_notion(
-                candidates=candidates,
-                notion_manager=notion_manager,
-                console=console,
-                max_concurrent=max_notion_concurrent,
-            )
 
-            overall_successful_uploads += successful_files
-            overall_duplicate_uploads += duplicate_files
-            overall_failed_uploads += failed_files
-            all_failed_files.extend(failed_files_list)
-            all_duplicate_files.extend(duplicate_files_list)
+                overall_successful_uploads += successful_files
+                overall_duplicate_uploads += duplicate_files
+                overall_failed_uploads += failed_files
+                all_failed_files.extend(failed_files_list)
+                all_duplicate_files.extend(duplicate_files_list)
 
-            # Update processed files log
-            if successful_files_list:
-                with open(processed_log_file, "a") as f:
+                if successful_files_list:
                     for file_name in successful_files_list:
-                        f.write(f"{file_name}\n")
+                        cv_hashes[file_hashes[file_name]] = file_name
+                    save_cv_hashes(root, cv_hashes)
+    finally:
+        extraction_pool.shutdown()
+        await notion_manager.aclose()
 
     # Display overall summary report
     rprint(Panel.fit("[bold green]Overall Processing Summary[/bold green]"))
@@ -272,10 +407,11 @@ async def process_command(
     if all_failed_files:
         rprint(Panel.fit("[bold red]All Failed Uploads[/bold red]"))
         for file_name in all_failed_files:
-            rprint(f"- {file_name}")
+            # File names and the "[no text extracted]" label are not Rich markup
+            rprint(f"- {escape(file_name)}")
 
     # Display all duplicate files
     if all_duplicate_files:
         rprint(Panel.fit("[bold yellow]All Duplicate Files (Skipped)[/bold yellow]"))
         for file_name in all_duplicate_files:
-            rprint(f"- {file_name}")
+            rprint(f"- {escape(file_name)}")
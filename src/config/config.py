@@ -2,7 +2,7 @@ from typing import Dict, Optional
 
 from rich import print as rprint
 
-from config.settings import settings
+from config.settings import CONFIG
 
 
 def get_config(
@@ -31,15 +31,17 @@ def get_config(
         ValueError: If required configuration is missing
     """
 
-    # Get configuration values with CLI overrides
-    config = {
-        "GEMINI_API_KEY": cli_gemini_api_key or settings.GEMINI_API_KEY,
-        "NOTION_API_KEY": cli_notion_api_key or settings.NOTION_API_KEY,
-        "NOTION_DATABASE_ID": cli_notion_db_id or settings.NOTION_DATABASE_ID,
-        "GEMINI_MODEL": cli_gemini_model or settings.GEMINI_MODEL,
-        "TEMPERATURE": cli_temperature or settings.TEMPERATURE,
-        "TIMEZONE": cli_timezone or settings.TIMEZONE,
+    # Get configuration values with CLI overrides; only options actually given
+    # override, so an explicit temperature of 0 is honoured
+    overrides = {
+        "GEMINI_API_KEY": cli_gemini_api_key,
+        "NOTION_API_KEY": cli_notion_api_key,
+        "NOTION_DATABASE_ID": cli_notion_db_id,
+        "GEMINI_MODEL": cli_gemini_model,
+        "TEMPERATURE": cli_temperature,
+        "TIMEZONE": cli_timezone,
     }
+    config = {**CONFIG, **{k: v for k, v in overrides.items() if v is not None}}
 
     # Check for required configuration
     required_keys = ["GEMINI_API_KEY", "NOTION_API_KEY", "NOTION_DATABASE_ID"]
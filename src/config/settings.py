@@ -1,10 +1,12 @@
+from types import MappingProxyType
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings, extra="ignore"):
     model_config = SettingsConfigDict(
-        env_file=".env", env_file_encoding="utf-8", env_ignore_env_file=True
+        env_file=".env", env_file_encoding="utf-8", env_ignore_env_file=True, frozen=True
     )
 
     GEMINI_API_KEY: str = Field(default="", json_schema_extra={"env": "GEMINI_API_KEY"})
@@ -20,3 +22,6 @@ class Settings(BaseSettings, extra="ignore"):
 
 
 settings = Settings()
+
+# Validated once at import; read-only so every command sees the same values
+CONFIG = MappingProxyType(settings.model_dump())
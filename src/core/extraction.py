@@ -2,8 +2,11 @@
 Text extraction functionality for Resume Analyzer Agent
 """
 
-import os
-from typing import Any, Dict, List
+import asyncio
+import hashlib
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Tuple
 
 from rich import print as rprint
 from rich.progress import (
@@ -14,62 +17,118 @@ from rich.progress import (
     TimeElapsedColumn,
 )
 
-from misc.file_processor import extract_text_from_file
+from misc.file_processor import (
+    extract_text_from_file,
+    read_cached_text,
+    write_cached_text,
+)
 
 
-async def extract_cv_text(cv_files: List[Dict[str, str]], console) -> List[Dict[str, Any]]:
+async def extract_cv_text(
+    cv_files: List[Dict[str, str]],
+    console,
+    executor: Optional[Executor] = None,
+    cache_dir: Optional[str] = None,
+) -> List[Dict[str, Any]]:
     """
     Extract text from CV files.
 
     Args:
-        cv_files: List of CV file paths
+        cv_files: List of CV file paths, optionally with their content "hash"
         console: Rich console for display
+        executor: Optional executor (e.g. a process pool) to parse files in parallel;
+            files are parsed one at a time on a worker thread when omitted
+        cache_dir: Optional directory where text is cached by content hash, so
+            files with a known "hash" are not parsed again
 
     Returns:
         List of dictionaries with file info and extracted text
     """
-    cv_data = []
+    loop = asyncio.get_running_loop()
+    # PDFium is not thread-safe, so without a process pool files are parsed one
+    # at a time on a single worker thread
+    own_executor = ThreadPoolExecutor(max_workers=1) if executor is None else None
+    executor = executor or own_executor
 
-    with Progress(
+    with own_executor or nullcontext(), Progress(
         SpinnerColumn(),
         TextColumn("[bold blue]{task.description}[/bold blue]"),
         BarColumn(),
         TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
         TimeElapsedColumn(),
         console=console,
+        refresh_per_second=4,
     ) as progress:
         extract_task = progress.add_task(
             f"Extracting text from {len(cv_files)} CV files...", total=len(cv_files)
         )
 
-        for idx, file in enumerate(cv_files, 1):
-            progress.update(
-                extract_task,
-                description=f"Extracting CV {idx} of {len(cv_files)}: {file['file_name']}",
+        async def parse(file):
+            return await loop.run_in_executor(
+                executor, extract_text_from_file, file['file_path']
             )
 
+        async def extract_one(file):
+            file_hash = file.get('hash') if cache_dir else None
+            cv_text = read_cached_text(cache_dir, file_hash) if file_hash else None
             try:
-                # Extract text from CV
-                cv_text = extract_text_from_file(file['file_path'])
-
-                if cv_text.strip():
-                    cv_data.append(
-                        {
-                            "file_path": file['file_path'],
-                            "file_name": file['file_name'],
-                            "text": cv_text,
-                        }
-                    )
-                else:
-                    rprint(
-                        f"\n[bold yellow]Empty text extracted from {file['file_name']}[/bold yellow]"
-                    )
+                if cv_text is None:
+                    # Extract text from CV
+                    cv_text = await parse(file)
+                    if file_hash and cv_text and not cv_text.isspace():
+                        write_cached_text(cache_dir, file_hash, cv_text)
             except Exception as e:
                 rprint(
                     f"\n[bold red]Error extracting text from {file['file_name']}: {str(e)}[/bold red]"
                 )
+                return None
+            finally:
+                progress.update(extract_task, advance=1)
+
+            # isspace stops at the first visible character instead of copying the text
+            if not cv_text or cv_text.isspace():
+                rprint(
+                    f"\n[bold yellow]Empty text extracted from {file['file_name']} (empty or scanned document)[/bold yellow]"
+                )
+                return None
 
-            progress.update(extract_task, advance=1)
+            return {
+                "file_path": file['file_path'],
+                "file_name": file['file_name'],
+                "hash": file.get('hash'),
+                "text": cv_text,
+            }
 
+        results = await asyncio.gather(*[extract_one(file) for file in cv_files])
+
+    cv_data = [result for result in results if result is not None]
     rprint(f"[bold green]✓[/bold green] Extracted text from {len(cv_data)} CV files")
     return cv_data
+
+
+def drop_identical_texts(
+    cv_data: List[Dict[str, Any]],
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Keep only the first CV of each group whose extracted text is identical, such as
+    the same resume re-exported or uploaded under another name.
+
+    Args:
+        cv_data: List of dictionaries with file info and extracted text
+
+    Returns:
+        Tuple of (unique_cv_data, identical_files_list)
+    """
+    unique_cv_data = []
+    identical_files_list = []
+    seen_texts = set()
+
+    for cv_item in cv_data:
+        text_hash = hashlib.sha256(cv_item["text"].encode("utf-8")).digest()
+        if text_hash in seen_texts:
+            identical_files_list.append(cv_item["file_name"])
+        else:
+            seen_texts.add(text_hash)
+            unique_cv_data.append(cv_item)
+
+    return unique_cv_data, identical_files_list
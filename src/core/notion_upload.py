@@ -2,142 +2,103 @@
 Notion upload functionality for Resume Analyzer Agent
 """
 
-import asyncio
 from typing import Any, Dict, List, Tuple
 
 from rich import print as rprint
-from rich.progress import (
-    BarColumn,
-    Progress,
-    SpinnerColumn,
-    TextColumn,
-    TimeElapsedColumn,
-)
 
 from api.notion import NotionManager
+from misc.utils import sniff_email
 
 
-async def upload_to_notion(
-    candidates: List[Dict[str, Any]],
+async def skip_known_duplicates(
+    cv_data: List[Dict[str, Any]],
     notion_manager: NotionManager,
-    console,
-    max_concurrent: int = 3,  # Maximum number of concurrent uploads
-) -> Tuple[int, int, int, List[str], List[str], List[str]]:
+) -> Tuple[List[Dict[str, Any]], List[str]]:
     """
-    Upload candidates to Notion database.
+    Drop CVs whose file hash or email is already in the Notion database before they
+    are sent to Gemini. Only a CV containing a single email address is matched by
+    email; the rest are left to the check on the email Gemini extracts.
 
     Args:
-        candidates: List of processed candidates
+        cv_data: List of dictionaries with file info and extracted text
         notion_manager: Initialized NotionManager
-        console: Rich console for display
-        max_concurrent: Maximum number of concurrent uploads (default: 3)
 
     Returns:
-        Tuple of (successful_files, duplicate_files, failed_files, successful_files_list, failed_files_list, duplicate_files_list)
+        Tuple of (remaining_cv_data, duplicate_files_list)
     """
-    successful_files = 0
-    duplicate_files = 0
-    failed_files = 0
-    successful_files_list = []
-    failed_files_list = []
+    remaining_cv_data = []
     duplicate_files_list = []
 
-    # Create a semaphore to limit concurrent uploads
-    semaphore = asyncio.Semaphore(max_concurrent)
-
-    async def process_notion_upload(candidate_item):
-        # Acquire the semaphore before processing
-        async with semaphore:
-            try:
-                # Check for duplicate in Notion
-                is_duplicate = await notion_manager.check_for_duplicate(
-                    candidate_item["candidate"].email
-                )
-                if is_duplicate:
-                    rprint(
-                        f"\n[bold yellow]Skipping duplicate candidate: {candidate_item['candidate'].full_name} ({candidate_item['candidate'].email})[/bold yellow]"
-                    )
-                    return {
-                        "status": "duplicate",
-                        "file_name": candidate_item["file_name"],
-                    }
-
-                # Create Notion page
-                page_id = await notion_manager.create_candidate_row(
-                    candidate=candidate_item["candidate"],
-                    cv_filepath=candidate_item["file_path"],
-                )
-
-                if page_id:
-                    return {
-                        "status": "success",
-                        "file_name": candidate_item["file_name"],
-                    }
-                else:
-                    return {
-                        "status": "failed",
-                        "file_name": candidate_item["file_name"],
-                        "error": "Failed to create Notion page",
-                    }
-            except Exception as e:
-                return {
-                    "status": "failed",
-                    "file_name": candidate_item["file_name"],
-                    "error": str(e),
-                }
-
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[bold blue]{task.description}[/bold blue]"),
-        BarColumn(),
-        TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-        TimeElapsedColumn(),
-        console=console,
-    ) as progress:
-        notion_task = progress.add_task(
-            f"Uploading {len(candidates)} candidates to Notion (max {max_concurrent} concurrent)...",
-            total=len(candidates),
-        )
+    for cv_item in cv_data:
+        if await notion_manager.check_for_hash(cv_item.get("hash")):
+            rprint(
+                f"\n[bold yellow]Skipping CV already uploaded: {cv_item['file_name']}[/bold yellow]"
+            )
+            duplicate_files_list.append(cv_item["file_name"])
+            continue
+
+        email = sniff_email(cv_item["text"])
+        if email and await notion_manager.check_for_duplicate(email):
+            rprint(
+                f"\n[bold yellow]Skipping duplicate candidate: {cv_item['file_name']} ({email})[/bold yellow]"
+            )
+            duplicate_files_list.append(cv_item["file_name"])
+        else:
+            remaining_cv_data.append(cv_item)
+
+    return remaining_cv_data, duplicate_files_list
+
 
-        # Create and schedule all Notion tasks
-        notion_tasks = [process_notion_upload(candidate_item) for candidate_item in candidates]
-        notion_results = []
-
-        # Process tasks as they complete
-        for future in asyncio.as_completed(notion_tasks):
-            result = await future
-            notion_results.append(result)
-
-            if result["status"] == "success":
-                successful_files += 1
-                successful_files_list.append(result["file_name"])
-            elif result["status"] == "duplicate":
-                duplicate_files += 1
-                duplicate_files_list.append(result["file_name"])
-            else:
-                failed_files += 1
-                failed_files_list.append(result["file_name"])
-                rprint(
-                    f"\n[bold red]Error uploading {result['file_name']} to Notion: {result.get('error', 'Unknown error')}[/bold red]"
-                )
-
-            progress.update(notion_task, advance=1)
-
-    rprint(
-        f"[bold green]✓[/bold green] Uploaded {successful_files} candidates to Notion"
-    )
-    if duplicate_files > 0:
-        rprint(
-            f"[bold yellow]⚠[/bold yellow] Skipped {duplicate_files} duplicate candidates"
+async def upload_candidate(
+    candidate_item: Dict[str, Any],
+    notion_manager: NotionManager,
+) -> Dict[str, Any]:
+    """
+    Upload a single processed candidate to Notion unless it is a duplicate.
+
+    Args:
+        candidate_item: Processed candidate with file info
+        notion_manager: Initialized NotionManager
+
+    Returns:
+        Result dictionary with status "success", "duplicate" or "failed"
+    """
+    try:
+        # Check for duplicate in Notion
+        is_duplicate = await notion_manager.check_for_duplicate(
+            candidate_item["candidate"].email
         )
-    if failed_files > 0:
-        rprint(f"[bold red]✗[/bold red] Failed to upload {failed_files} candidates")
-
-    return (
-        successful_files,
-        duplicate_files,
-        failed_files,
-        successful_files_list,
-        failed_files_list,
-        duplicate_files_list,
-    )
\ No newline at end of file
+        if is_duplicate:
+            rprint(
+                f"\n[bold yellow]Skipping duplicate candidate: {candidate_item['candidate'].full_name} ({candidate_item['candidate'].email})[/bold yellow]"
+            )
+            return {
+                "status": "duplicate",
+                "file_name": candidate_item["file_name"],
+            }
+
+        # Create Notion page
+        page_id = await notion_manager.create_candidate_row(
+            candidate=candidate_item["candidate"],
+            cv_filepath=candidate_item["file_path"],
+            cv_hash=candidate_item.get("hash"),
+        )
+
+        if page_id:
+            return {
+                "status": "success",
+                "file_name": candidate_item["file_name"],
+            }
+        else:
+            return {
+                "status": "failed",
+                "file_name": candidate_item["file_name"],
+                "error": "Failed to create Notion page",
+            }
+    except Exception as e:
+        return {
+            "status": "failed",
+            "file_name": candidate_item["file_name"],
+            "error": str(e),
+        }
+
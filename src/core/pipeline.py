@@ -0,0 +1,194 @@
+"""
+Per-CV Gemini to Notion pipeline for Resume Analyzer Agent
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from google import genai
+from rich import print as rprint
+from rich.progress import (
+    BarColumn,
+    Progress,
+    SpinnerColumn,
+    TextColumn,
+    TimeElapsedColumn,
+)
+
+from api.notion import NotionManager
+from core.gemini_processing import analyze_cv, analyze_cv_batch
+from core.notion_upload import upload_candidate
+from misc.file_processor import append_processed_files
+
+
+async def process_cvs(
+    cv_data: List[Dict[str, Any]],
+    jd_text: str,
+    gemini_client: genai.Client,
+    notion_manager: NotionManager,
+    model: str,
+    temperature: float,
+    console,
+    max_gemini_concurrent: int = 5,
+    max_notion_concurrent: int = 3,
+    gemini_batch_size: int = 1,
+    processed_dir: Optional[str] = None,
+) -> Tuple[int, int, int, List[str], List[str], List[str]]:
+    """
+    Analyze each CV with Gemini API and upload it to Notion as soon as its own
+    analysis is done, instead of waiting for the whole batch between the two stages.
+
+    Args:
+        cv_data: List of dictionaries with file info and extracted text
+        jd_text: Job description text
+        gemini_client: Initialized Gemini client
+        notion_manager: Initialized NotionManager
+        model: Gemini model name
+        temperature: Generation temperature
+        console: Rich console for display
+        max_gemini_concurrent: Maximum number of concurrent Gemini API calls (default: 5)
+        max_notion_concurrent: Maximum number of concurrent Notion uploads (default: 3)
+        gemini_batch_size: Number of CVs analyzed per Gemini API request (default: 1)
+        processed_dir: Optional position folder whose processed files log records
+            each CV as soon as its upload succeeds, so an interrupted run resumes
+            without re-uploading it
+
+    Returns:
+        Tuple of (successful_files, duplicate_files, failed_files, successful_files_list, failed_files_list, duplicate_files_list)
+    """
+    successful_files_list = []
+    failed_files_list = []
+    duplicate_files_list = []
+
+    batch_size = max(1, gemini_batch_size)
+    batches = [cv_data[start : start + batch_size] for start in range(0, len(cv_data), batch_size)]
+
+    # Fixed pools of Gemini and Notion workers connected by bounded queues; the
+    # bounds stop each stage from running arbitrarily far ahead of the next
+    gemini_worker_count = max(1, min(max_gemini_concurrent, len(batches)))
+    batch_queue: asyncio.Queue = asyncio.Queue(maxsize=max_gemini_concurrent * 2)
+    candidate_queue: asyncio.Queue = asyncio.Queue(maxsize=max_gemini_concurrent * 2)
+    log_lock = asyncio.Lock()
+
+    async def analyze(cv_items):
+        if len(cv_items) == 1:
+            return [
+                await analyze_cv(
+                    cv_item=cv_items[0],
+                    jd_text=jd_text,
+                    gemini_client=gemini_client,
+                    model=model,
+                    temperature=temperature,
+                )
+            ]
+        return await analyze_cv_batch(
+            cv_items=cv_items,
+            jd_text=jd_text,
+            gemini_client=gemini_client,
+            model=model,
+            temperature=temperature,
+        )
+
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[bold blue]{task.description}[/bold blue]"),
+        BarColumn(),
+        TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+        TimeElapsedColumn(),
+        console=console,
+        # Updates only record progress; redrawing 4 times a second is plenty
+        refresh_per_second=4,
+    ) as progress:
+        pipeline_task = progress.add_task(
+            f"Processing {len(cv_data)} CVs (max {max_gemini_concurrent} Gemini / {max_notion_concurrent} Notion concurrent)...",
+            total=len(cv_data),
+        )
+
+        async def feed():
+            for cv_items in batches:
+                await batch_queue.put(cv_items)
+            for _ in range(gemini_worker_count):
+                await batch_queue.put(None)
+
+        async def produce():
+            while True:
+                cv_items = await batch_queue.get()
+                if cv_items is None:
+                    return
+
+                for result in await analyze(cv_items):
+                    if result["status"] == "success":
+                        await candidate_queue.put(result)
+                        continue
+
+                    failed_files_list.append(result["file_name"])
+                    progress.update(pipeline_task, advance=1)
+                    rprint(
+                        f"\n[bold red]Error processing {result['file_name']} with Gemini: {result.get('error', 'Unknown error')}[/bold red]"
+                    )
+
+        async def consume():
+            while True:
+                candidate_item = await candidate_queue.get()
+                if candidate_item is None:
+                    return
+
+                try:
+                    result = await upload_candidate(candidate_item, notion_manager)
+                except Exception as e:
+                    result = {
+                        "status": "failed",
+                        "file_name": candidate_item["file_name"],
+                        "error": str(e),
+                    }
+                progress.update(pipeline_task, advance=1)
+
+                if result["status"] == "success":
+                    successful_files_list.append(result["file_name"])
+                    if processed_dir:
+                        async with log_lock:
+                            await asyncio.to_thread(
+                                append_processed_files, processed_dir, [result["file_name"]]
+                            )
+                elif result["status"] == "duplicate":
+                    duplicate_files_list.append(result["file_name"])
+                else:
+                    failed_files_list.append(result["file_name"])
+                    rprint(
+                        f"\n[bold red]Error uploading {result['file_name']} to Notion: {result.get('error', 'Unknown error')}[/bold red]"
+                    )
+
+        # Task groups cancel the remaining workers if one of them crashes, so a
+        # failed stage cannot leave the other blocked on a full or empty queue
+        async with asyncio.TaskGroup() as notion_workers:
+            consumers = [
+                notion_workers.create_task(consume())
+                for _ in range(max(1, max_notion_concurrent))
+            ]
+            async with asyncio.TaskGroup() as gemini_workers:
+                gemini_workers.create_task(feed())
+                for _ in range(gemini_worker_count):
+                    gemini_workers.create_task(produce())
+
+            # One sentinel per consumer once every analysis has been queued
+            for _ in consumers:
+                await candidate_queue.put(None)
+
+    rprint(
+        f"[bold green]✓[/bold green] Uploaded {len(successful_files_list)} candidates to Notion"
+    )
+    if duplicate_files_list:
+        rprint(
+            f"[bold yellow]⚠[/bold yellow] Skipped {len(duplicate_files_list)} duplicate candidates"
+        )
+    if failed_files_list:
+        rprint(f"[bold red]✗[/bold red] Failed to process {len(failed_files_list)} candidates")
+
+    return (
+        len(successful_files_list),
+        len(duplicate_files_list),
+        len(failed_files_list),
+        successful_files_list,
+        failed_files_list,
+        duplicate_files_list,
+    )
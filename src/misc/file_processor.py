@@ -2,22 +2,60 @@
 File processing utilities.
 """
 
+import hashlib
 import logging
 import os
-from typing import Dict, List
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Set
 
-import pdfplumber
+import orjson
+import pypdfium2 as pdfium
 from docx import Document
+from docx.opc.exceptions import PackageNotFoundError
 
-logging.getLogger("pdfminer").setLevel(logging.ERROR)
+CV_EXTENSIONS = frozenset({".pdf", ".docx"})
+JD_EXTENSIONS = frozenset({".pdf"})
 
+# "pdfium" is fastest; "pdfplumber" rebuilds lines from character positions,
+# which can keep the reading order of some multi-column layouts
+PDF_BACKEND = os.environ.get("RESUME_ANALYZER_PDF_BACKEND", "pdfium").lower()
 
-def extract_text_from_pdf(pdf_path: str) -> str:
+
+@contextmanager
+def _open_pdf_pages(pdf_path: str) -> Iterator[Iterable[str]]:
+    """
+    Open a PDF with the configured backend and yield the text of its pages lazily.
+    """
+    if PDF_BACKEND == "pdfplumber":
+        import pdfplumber
+
+        logging.getLogger("pdfminer").setLevel(logging.ERROR)
+        with pdfplumber.open(pdf_path) as pdf:
+            yield (page.extract_text() or "" for page in pdf.pages)
+        return
+
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        yield (page.get_textpage().get_text_range() for page in pdf)
+    finally:
+        pdf.close()
+
+
+# A CV whose leading pages have less text than this together is treated as empty
+# or scanned. Two pages are checked since a photo or cover page can be nearly blank.
+CV_LEADING_PAGES = 2
+MIN_CV_LEADING_CHARS = 50
+
+
+def extract_text_from_pdf(pdf_path: str, min_leading_chars: int = 0) -> str:
     """
     Extract text content from a PDF file.
 
     Args:
         pdf_path: Path to the PDF file
+        min_leading_chars: Return an empty string without parsing the remaining
+            pages if the first CV_LEADING_PAGES pages together have fewer
+            characters of text than this
 
     Returns:
         Extracted text as a string
@@ -26,15 +64,67 @@ def extract_text_from_pdf(pdf_path: str) -> str:
         FileNotFoundError: If the file doesn't exist
         ValueError: If the file is password-protected or corrupted
     """
-    if not os.path.exists(pdf_path):
-        raise FileNotFoundError(f"PDF file not found: {pdf_path}")
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            return "\n".join(page.extract_text() or "" for page in pdf.pages)
+        with _open_pdf_pages(pdf_path) as pages:
+            page_texts = []
+            leading_chars = 0
+            for page_text in pages:
+                page_texts.append(page_text)
+                if len(page_texts) <= CV_LEADING_PAGES:
+                    leading_chars += len(page_text.strip())
+                    if len(page_texts) == CV_LEADING_PAGES and leading_chars < min_leading_chars:
+                        return ""
+        # PDFium separates lines with CRLF
+        return "\n".join(page_texts).replace("\r\n", "\n")
+    except FileNotFoundError:
+        raise FileNotFoundError(f"PDF file not found: {pdf_path}")
     except Exception as e:
         raise ValueError(f"Error extracting text from PDF: {str(e)}")
 
 
+JD_CACHE_FILE = ".jd_cache.txt"
+
+
+def get_jd_text_cached(jd_file: str) -> str:
+    """
+    Extract text from a job description PDF, reusing the text cached next to it
+    when the file has not changed since it was last parsed.
+
+    Args:
+        jd_file: Path to the job description PDF
+
+    Returns:
+        Extracted text as a string
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        ValueError: If the file is password-protected or corrupted
+    """
+    try:
+        stat = os.stat(jd_file)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"PDF file not found: {jd_file}") from None
+    key = f"{os.path.basename(jd_file)}-{stat.st_mtime_ns}-{stat.st_size}"
+    cache_file = os.path.join(os.path.dirname(jd_file), JD_CACHE_FILE)
+
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            header, _, text = f.read().partition("\n")
+        if header == key:
+            return text
+    except OSError:
+        pass
+
+    text = extract_text_from_pdf(jd_file)
+    try:
+        with open(cache_file, "w", encoding="utf-8") as f:
+            f.write(f"{key}\n{text}")
+    except OSError:
+        # The cache is an optimisation; a read-only folder must not fail the run
+        pass
+    return text
+
+
 def extract_text_from_docx(docx_path: str) -> str:
     """
     Extract text content from a DOCX file.
@@ -49,11 +139,15 @@ def extract_text_from_docx(docx_path: str) -> str:
         FileNotFoundError: If the file doesn't exist
         ValueError: If the file is corrupted
     """
-    if not os.path.exists(docx_path):
-        raise FileNotFoundError(f"DOCX file not found: {docx_path}")
     try:
         doc = Document(docx_path)
-        return "\n".join(paragraph.text for paragraph in doc.paragraphs)
+        # Blank spacer paragraphs carry no text; skip them before joining
+        return "\n".join([text for paragraph in doc.paragraphs if (text := paragraph.text)])
+    except PackageNotFoundError as e:
+        # python-docx raises this for missing and non-DOCX files alike
+        if not os.path.exists(docx_path):
+            raise FileNotFoundError(f"DOCX file not found: {docx_path}")
+        raise ValueError(f"Error extracting text from DOCX: {str(e)}")
     except Exception as e:
         raise ValueError(f"Error extracting text from DOCX: {str(e)}")
 
@@ -74,14 +168,14 @@ def get_cv_files(folder_path: str) -> List[str]:
     if not os.path.exists(folder_path):
         return []
 
-    cv_files = []
-    for filename in os.listdir(folder_path):
-        file_path = os.path.join(folder_path, filename)
-        # Check if it's a file and has the right extension
-        if os.path.isfile(file_path) and filename.lower().endswith((".pdf", ".docx")):
-            cv_files.append(file_path)
-
-    return cv_files
+    # scandir entries carry the file type from the directory listing, so
+    # is_file() does not need a stat call per entry
+    with os.scandir(folder_path) as entries:
+        return [
+            entry.path
+            for entry in entries
+            if os.path.splitext(entry.name)[1].lower() in CV_EXTENSIONS and entry.is_file()
+        ]
 
 
 def format_cv_files(file_paths: List[str]) -> List[Dict[str, str]]:
@@ -113,9 +207,138 @@ def extract_text_from_file(file_path: str) -> str:
     Raises:
         ValueError: If the file type is not supported
     """
-    if file_path.lower().endswith(".pdf"):
-        return extract_text_from_pdf(file_path)
-    elif file_path.lower().endswith(".docx"):
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == ".pdf":
+        # Image-only (scanned) CVs have no text layer; bail out after the leading pages
+        return extract_text_from_pdf(file_path, min_leading_chars=MIN_CV_LEADING_CHARS)
+    elif extension == ".docx":
         return extract_text_from_docx(file_path)
     else:
         raise ValueError(f"Unsupported file type: {file_path.split('.')[-1]}")
+
+
+EXTRACTION_CACHE_DIR = ".extraction_cache"
+
+
+def _cached_text_path(cache_dir: str, file_hash: str) -> str:
+    # Text from another PDF backend or leading-text threshold must not be served
+    # back, so each extraction setup keeps its own subdirectory
+    variant = f"{PDF_BACKEND}-{MIN_CV_LEADING_CHARS}"
+    return os.path.join(cache_dir, variant, f"{file_hash}.txt")
+
+
+def read_cached_text(cache_dir: str, file_hash: str) -> Optional[str]:
+    """
+    Read previously extracted text for a file's content digest.
+
+    Args:
+        cache_dir: Directory holding the extracted text cache
+        file_hash: SHA-256 digest of the file contents
+
+    Returns:
+        Cached text or None on a miss
+    """
+    try:
+        with open(_cached_text_path(cache_dir, file_hash), "r", encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def write_cached_text(cache_dir: str, file_hash: str, text: str) -> None:
+    """
+    Store extracted text under a file's content digest.
+
+    Args:
+        cache_dir: Directory holding the extracted text cache
+        file_hash: SHA-256 digest of the file contents
+        text: Extracted text
+    """
+    try:
+        path = _cached_text_path(cache_dir, file_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so a crash never leaves partial text behind
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+CV_HASHES_FILE = ".cv_hashes.json"
+
+
+def hash_file(file_path: str) -> str:
+    """
+    Compute the SHA-256 digest of a file's contents.
+
+    Args:
+        file_path: Path to the file
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    with open(file_path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def load_cv_hashes(folder_path: str) -> Dict[str, str]:
+    """
+    Load the digests of CVs already uploaded from a position folder.
+
+    Args:
+        folder_path: Path to the position folder
+
+    Returns:
+        Dictionary mapping CV digest to the name of the file it was uploaded as
+    """
+    try:
+        with open(os.path.join(folder_path, CV_HASHES_FILE), "rb") as f:
+            return orjson.loads(f.read())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cv_hashes(folder_path: str, cv_hashes: Dict[str, str]) -> None:
+    """
+    Save the digests of CVs uploaded from a position folder.
+
+    Args:
+        folder_path: Path to the position folder
+        cv_hashes: Dictionary mapping CV digest to the name of the file it was uploaded as
+    """
+    with open(os.path.join(folder_path, CV_HASHES_FILE), "wb") as f:
+        f.write(orjson.dumps(cv_hashes, option=orjson.OPT_INDENT_2))
+
+
+PROCESSED_LOG_FILE = ".processed_files.log"
+
+
+def load_processed_files(folder_path: str) -> Set[str]:
+    """
+    Load the names of CVs already processed for a position folder.
+
+    Args:
+        folder_path: Path to the position folder
+
+    Returns:
+        Set of processed file names, empty if there is no log yet
+    """
+    try:
+        with open(os.path.join(folder_path, PROCESSED_LOG_FILE), "r") as f:
+            return {line.rstrip("\n") for line in f}
+    except FileNotFoundError:
+        return set()
+
+
+def append_processed_files(folder_path: str, file_names: Iterable[str]) -> None:
+    """
+    Record newly processed CVs for a position folder in a single append.
+
+    Args:
+        folder_path: Path to the position folder
+        file_names: Names of the files that were processed
+    """
+    with open(os.path.join(folder_path, PROCESSED_LOG_FILE), "a") as f:
+        f.writelines(f"{file_name}\n" for file_name in file_names)
@@ -1,6 +1,14 @@
+import re
+from typing import Optional
+
 from rich.panel import Panel
 from rich.text import Text
 
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+
+# Notion URLs use the database ID without hyphens
+_HYPHEN_TRANS = str.maketrans("", "", "-")
+
 
 class CustomPanel(Panel):
     """Custom Panel class that includes the content in the string representation."""
@@ -47,8 +55,27 @@ def format_processing_stats(
         summary.append(f"{total_files - processed_files} files were not processed")
 
     # Add the Notion Database URL
-    notion_url = f"https://notion.so/{notion_db_id.replace('-', '')}"
+    notion_url = f"https://notion.so/{notion_db_id.translate(_HYPHEN_TRANS)}"
     summary.append(f"\nNotion Database URL: {notion_url}")
 
     summary_text = "\n".join(summary)
     return CustomPanel(summary_text, title="Processing Summary")
+
+
+def sniff_email(text: str) -> Optional[str]:
+    """
+    Find the candidate's email address in raw CV text.
+
+    Only a CV with a single distinct address is trusted; with several, the first
+    may well belong to a referee or a former employer.
+
+    Args:
+        text: Extracted CV text
+
+    Returns:
+        The only email address found, or None if there are none or several
+    """
+    emails = [match.rstrip(".") for match in EMAIL_PATTERN.findall(text)]
+    if not emails or len({email.lower() for email in emails}) > 1:
+        return None
+    return emails[0]
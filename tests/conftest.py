@@ -4,6 +4,8 @@ Shared fixtures for tests
 
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType, SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
@@ -17,6 +19,50 @@ os.environ["NOTION_API_KEY"] = "test_notion_api_key"
 os.environ["NOTION_DATABASE_ID"] = "test_notion_database_id"
 os.environ["TIMEZONE"] = "UTC"
 
+from api.models import Candidate
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path, monkeypatch):
+    """Keep the Gemini response cache out of the user's home directory."""
+    monkeypatch.setenv("RESUME_ANALYZER_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.delenv("RESUME_ANALYZER_NO_CACHE", raising=False)
+
+
+# Read-only so tests sharing it cannot leak changes into each other
+SAMPLE_CANDIDATE_JSON = MappingProxyType(
+    {
+        "full_name": "John Doe",
+        "email": "john.doe@example.com",
+        "contact_number": "+1234567890",
+        "date_of_birth": "1990-01-01",
+        "gender": "Male",
+        "linkedin_url": "https://linkedin.com/in/johndoe",
+        "years_of_experience": 5,
+        "experience_summary": "5 years of Python development experience",
+        "profile_summary": "Experienced software engineer with 5 years of experience in Python development.",
+        "professional_skills": ["Python", "Django", "React"],
+        "personal_skills": ["Problem solving", "Communication"],
+        "match_score": 88,
+        "ranking_category": "High Fit",
+        "ranking_reason": "The candidate has the required skills and experience for the role.",
+        "job_location": "Singapore",
+        "job_position_title": "Senior Python Developer",
+    }
+)
+
+
+@pytest.fixture(scope="session")
+def sample_candidate_json():
+    """Sample candidate fields as returned by Gemini."""
+    return SAMPLE_CANDIDATE_JSON
+
+
+@pytest.fixture(scope="session")
+def sample_candidate(sample_candidate_json):
+    """Sample candidate, validated once per session; Candidate is frozen, so sharing is safe."""
+    return Candidate.model_validate(sample_candidate_json)
+
 
 @pytest.fixture
 def sample_cv_text():
@@ -84,17 +130,56 @@ def mock_notion_manager():
     """Mock Notion manager for testing."""
     mock_manager = AsyncMock()
     mock_manager.check_for_duplicate = AsyncMock(return_value=False)
+    mock_manager.check_for_hash = AsyncMock(return_value=False)
     mock_manager.create_candidate_row = AsyncMock(return_value="test_page_id")
     mock_manager.configure = AsyncMock(return_value=mock_manager)
     return mock_manager
 
 
+@pytest.fixture
+def notion_mock():
+    """NotionManager instance mock returned by the patched NotionManager class."""
+    manager = AsyncMock()
+    manager.configure.return_value = manager
+    return manager
+
+
 @pytest.fixture
 def mock_console():
     """Mock Rich console for testing."""
     mock_console = MagicMock(spec=Console)
     # Add required attributes for Rich Progress
-    mock_console.get_time = MagicMock(return_value=time.monotonic())
+    mock_console.get_time = time.monotonic
     mock_console.is_jupyter = False
     mock_console.is_interactive = True
     return mock_console
+
+
+@pytest.fixture
+def process_mocks():
+    """Mocks for the process command's collaborators."""
+    return SimpleNamespace(
+        rprint=MagicMock(),
+        get_config=MagicMock(),
+        verify_gemini_api_key=AsyncMock(),
+        genai=MagicMock(),
+        NotionManager=MagicMock(),
+        get_jd_text_cached=MagicMock(),
+        extract_cv_text=AsyncMock(),
+        skip_known_duplicates=AsyncMock(),
+        process_cvs=AsyncMock(),
+        format_processing_stats=MagicMock(),
+    )
+
+
+@pytest.fixture
+def patched_process(process_mocks, monkeypatch):
+    """Swap the process_mocks into commands.process for one test."""
+    for name, mock in vars(process_mocks).items():
+        monkeypatch.setattr(f"commands.process.{name}", mock)
+    # Spawned workers would import the real parsers; a thread sees the mocks
+    monkeypatch.setattr(
+        "commands.process.ProcessPoolExecutor",
+        lambda **kwargs: ThreadPoolExecutor(max_workers=1),
+    )
+    return process_mocks
@@ -2,17 +2,10 @@
 Tests for the config module
 """
 
-import os
-import sys
-from unittest.mock import MagicMock, mock_open, patch
+from unittest.mock import mock_open, patch
 
 import pytest
 
-# Add src directory to path
-sys.path.insert(
-    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
-)
-
 from config.config import create_env_example, get_config
 
 
@@ -21,17 +14,18 @@ class TestConfig:
 
     def test_get_config_all_values_from_env(self):
         """Test loading config with all values from environment."""
-        # Use a fresh MagicMock to avoid interference from environment variables
-        mock_settings = MagicMock()
-        mock_settings.GEMINI_API_KEY = "env_gemini_key"
-        mock_settings.NOTION_API_KEY = "env_notion_key"
-        mock_settings.NOTION_DATABASE_ID = "env_notion_db"
-        mock_settings.GEMINI_MODEL = "env_gemini_model"
-        mock_settings.TEMPERATURE = 0.7
-        mock_settings.TIMEZONE = "Europe/London"
-
-        # Mock the settings module
-        with patch("config.config.settings", mock_settings):
+        # Use fixed settings to avoid interference from environment variables
+        mock_config = {
+            "GEMINI_API_KEY": "env_gemini_key",
+            "NOTION_API_KEY": "env_notion_key",
+            "NOTION_DATABASE_ID": "env_notion_db",
+            "GEMINI_MODEL": "env_gemini_model",
+            "TEMPERATURE": 0.7,
+            "TIMEZONE": "Europe/London",
+        }
+
+        # Mock the frozen settings
+        with patch("config.config.CONFIG", mock_config):
             # Call the function
             config = get_config()
 
@@ -45,17 +39,18 @@ class TestConfig:
 
     def test_get_config_with_cli_overrides(self):
         """Test loading config with CLI overrides."""
-        # Use a fresh MagicMock to avoid interference from environment variables
-        mock_settings = MagicMock()
-        mock_settings.GEMINI_API_KEY = "env_gemini_key"
-        mock_settings.NOTION_API_KEY = "env_notion_key"
-        mock_settings.NOTION_DATABASE_ID = "env_notion_db"
-        mock_settings.GEMINI_MODEL = "env_gemini_model"
-        mock_settings.TEMPERATURE = 0.7
-        mock_settings.TIMEZONE = "Europe/London"
-
-        # Mock the settings module
-        with patch("config.config.settings", mock_settings):
+        # Use fixed settings to avoid interference from environment variables
+        mock_config = {
+            "GEMINI_API_KEY": "env_gemini_key",
+            "NOTION_API_KEY": "env_notion_key",
+            "NOTION_DATABASE_ID": "env_notion_db",
+            "GEMINI_MODEL": "env_gemini_model",
+            "TEMPERATURE": 0.7,
+            "TIMEZONE": "Europe/London",
+        }
+
+        # Mock the frozen settings
+        with patch("config.config.CONFIG", mock_config):
             # Call the function with CLI overrides
             config = get_config(
                 cli_notion_db_id="cli_notion_db",
@@ -74,19 +69,37 @@ class TestConfig:
             assert config["TEMPERATURE"] == 0.2
             assert config["TIMEZONE"] == "America/New_York"
 
+    def test_get_config_zero_temperature_override(self):
+        """Test an explicit zero temperature from the CLI is not replaced by the default."""
+        mock_config = {
+            "GEMINI_API_KEY": "env_gemini_key",
+            "NOTION_API_KEY": "env_notion_key",
+            "NOTION_DATABASE_ID": "env_notion_db",
+            "GEMINI_MODEL": "env_gemini_model",
+            "TEMPERATURE": 0.7,
+            "TIMEZONE": "UTC",
+        }
+
+        with patch("config.config.CONFIG", mock_config):
+            config = get_config(cli_temperature=0.0)
+
+            assert config["TEMPERATURE"] == 0.0
+            assert mock_config["TEMPERATURE"] == 0.7
+
     def test_get_config_missing_required_values(self):
         """Test error when required config values are missing."""
-        # Use a fresh MagicMock to avoid interference from environment variables
-        mock_settings = MagicMock()
-        mock_settings.GEMINI_API_KEY = ""
-        mock_settings.NOTION_API_KEY = "env_notion_key"
-        mock_settings.NOTION_DATABASE_ID = ""
-        mock_settings.GEMINI_MODEL = "env_gemini_model"
-        mock_settings.TEMPERATURE = 0.7
-        mock_settings.TIMEZONE = "UTC"
-
-        # Mock the settings module
-        with patch("config.config.settings", mock_settings):
+        # Use fixed settings to avoid interference from environment variables
+        mock_config = {
+            "GEMINI_API_KEY": "",
+            "NOTION_API_KEY": "env_notion_key",
+            "NOTION_DATABASE_ID": "",
+            "GEMINI_MODEL": "env_gemini_model",
+            "TEMPERATURE": 0.7,
+            "TIMEZONE": "UTC",
+        }
+
+        # Mock the frozen settings
+        with patch("config.config.CONFIG", mock_config):
             # Call the function and expect ValueError
             with pytest.raises(ValueError) as exc_info:
                 get_config()
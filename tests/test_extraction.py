@@ -2,38 +2,18 @@
 Tests for core extraction functionality
 """
 
-import os
-import sys
-import time
-from unittest.mock import MagicMock, patch
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
 
 import pytest
-from rich.console import Console
 
-# Add src directory to path
-sys.path.insert(
-    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
-)
-
-from core.extraction import extract_cv_text
+from core.extraction import drop_identical_texts, extract_cv_text
 
 
 class TestExtraction:
     """Tests for core extraction functionality."""
 
-    @pytest.fixture
-    def mock_console(self):
-        """Create a mock console for testing."""
-        mock = MagicMock(spec=Console)
-        # Add get_time method needed by Progress
-        mock.get_time = MagicMock(return_value=time.monotonic())
-        # Add attributes needed by Progress
-        mock.is_jupyter = False
-        mock.is_interactive = False
-        # Mock the print method for assertions
-        mock.print = MagicMock()
-        return mock
-
     @pytest.mark.asyncio
     @patch("core.extraction.extract_text_from_file")
     @patch(
@@ -44,7 +24,13 @@ class TestExtraction:
     ):
         """Test successful CV text extraction."""
         # Setup mock
-        mock_extract.return_value = "CV content"
+        parse_threads = []
+
+        def extract(path):
+            parse_threads.append(threading.get_ident())
+            return "CV content"
+
+        mock_extract.side_effect = extract
 
         # Sample CV files
         cv_files = [
@@ -70,6 +56,10 @@ class TestExtraction:
 
         # Verify extraction calls
         assert mock_extract.call_count == 2
+        # PDFium is not thread-safe: without an executor, files are parsed on a
+        # single worker thread
+        assert len(set(parse_threads)) == 1
+        assert threading.get_ident() not in parse_threads
 
     @pytest.mark.asyncio
     @patch("core.extraction.extract_text_from_file")
@@ -146,3 +136,93 @@ class TestExtraction:
 
         # Assert
         assert result == []
+
+    @pytest.mark.asyncio
+    @patch("core.extraction.extract_text_from_file")
+    @patch(
+        "core.extraction.rprint"
+    )  # Mock rich print to avoid console output during tests
+    async def test_extract_cv_text_with_executor(
+        self, mock_rprint, mock_extract, mock_console
+    ):
+        """Test CV text extraction offloaded to an executor keeps input order."""
+        mock_extract.side_effect = lambda path: f"Text of {path}"
+        cv_files = [
+            {"file_name": f"cv{i}.pdf", "file_path": f"path/to/cv{i}.pdf"}
+            for i in range(1, 5)
+        ]
+
+        # A thread pool stands in for the process pool, which cannot run mocks
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            result = await extract_cv_text(cv_files, mock_console, executor=executor)
+
+        assert [item["file_name"] for item in result] == [
+            "cv1.pdf",
+            "cv2.pdf",
+            "cv3.pdf",
+            "cv4.pdf",
+        ]
+        assert result[2]["text"] == "Text of path/to/cv3.pdf"
+        assert mock_extract.call_count == 4
+
+    @pytest.mark.asyncio
+    @patch("core.extraction.extract_text_from_file")
+    @patch(
+        "core.extraction.rprint"
+    )  # Mock rich print to avoid console output during tests
+    async def test_extract_cv_text_uses_cache(
+        self, mock_rprint, mock_extract, mock_console, tmp_path
+    ):
+        """Test text is cached by content hash and not parsed again."""
+        mock_extract.return_value = "CV content"
+        cv_files = [
+            {"file_name": "cv1.pdf", "file_path": "path/to/cv1.pdf", "hash": "abc123"},
+        ]
+        cache_dir = str(tmp_path / ".extraction_cache")
+
+        first = await extract_cv_text(cv_files, mock_console, cache_dir=cache_dir)
+        # The same content under another name is served from the cache
+        renamed = [dict(cv_files[0], file_name="cv1 copy.pdf")]
+        second = await extract_cv_text(renamed, mock_console, cache_dir=cache_dir)
+
+        assert first[0]["text"] == second[0]["text"] == "CV content"
+        assert second[0]["file_name"] == "cv1 copy.pdf"
+        mock_extract.assert_called_once()
+
+    @pytest.mark.asyncio
+    @patch("core.extraction.extract_text_from_file")
+    @patch("core.extraction.rprint")
+    async def test_extract_cv_text_cache_follows_extraction_setup(
+        self, mock_rprint, mock_extract, mock_console, tmp_path
+    ):
+        """Test cached text is not reused across PDF backends and empty text is not cached."""
+        cv_files = [
+            {"file_name": "cv1.pdf", "file_path": "path/to/cv1.pdf", "hash": "abc123"},
+        ]
+        cache_dir = str(tmp_path / ".extraction_cache")
+
+        # An empty result is parsed again next time
+        mock_extract.return_value = ""
+        assert await extract_cv_text(cv_files, mock_console, cache_dir=cache_dir) == []
+
+        mock_extract.return_value = "PDFium text"
+        await extract_cv_text(cv_files, mock_console, cache_dir=cache_dir)
+        with patch("misc.file_processor.PDF_BACKEND", "pdfplumber"):
+            mock_extract.return_value = "pdfplumber text"
+            result = await extract_cv_text(cv_files, mock_console, cache_dir=cache_dir)
+
+        assert result[0]["text"] == "pdfplumber text"
+        assert mock_extract.call_count == 3
+
+    def test_drop_identical_texts(self):
+        """Test CVs with text identical to an earlier CV are dropped."""
+        cv_data = [
+            {"file_name": "cv1.pdf", "file_path": "cv1.pdf", "text": "Resume A"},
+            {"file_name": "cv1 (copy).docx", "file_path": "cv1 (copy).docx", "text": "Resume A"},
+            {"file_name": "cv2.pdf", "file_path": "cv2.pdf", "text": "Resume B"},
+        ]
+
+        unique, identical = drop_identical_texts(cv_data)
+
+        assert [item["file_name"] for item in unique] == ["cv1.pdf", "cv2.pdf"]
+        assert identical == ["cv1 (copy).docx"]
@@ -3,19 +3,19 @@ Tests for file processor module
 """
 
 import os
-import sys
 from unittest.mock import MagicMock, patch
 
-# Add src directory to path
-sys.path.insert(
-    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
-)
-
 from misc.file_processor import (
+    append_processed_files,
     extract_text_from_docx,
     extract_text_from_pdf,
     format_cv_files,
     get_cv_files,
+    get_jd_text_cached,
+    hash_file,
+    load_cv_hashes,
+    load_processed_files,
+    save_cv_hashes,
 )
 
 
@@ -35,93 +35,123 @@ class TestFileProcessor:
         mock_doc.paragraphs = [mock_para1, mock_para2]
         mock_document.return_value = mock_doc
 
-        # Mock file existence check
-        with patch("os.path.exists") as mock_exists:
-            mock_exists.return_value = True
-
-            # Execute
-            result = extract_text_from_docx("dummy.docx")
+        # Execute
+        result = extract_text_from_docx("dummy.docx")
 
-            # Assert
-            assert result == "Paragraph 1\nParagraph 2"
-            mock_document.assert_called_once_with("dummy.docx")
+        # Assert
+        assert result == "Paragraph 1\nParagraph 2"
+        mock_document.assert_called_once_with("dummy.docx")
 
-    @patch("pdfplumber.open")
+    @patch("misc.file_processor.pdfium.PdfDocument")
     def test_extract_text_from_pdf(self, mock_pdf_open):
         """Test extracting text from a PDF file."""
         # Setup mock PDF
         mock_page1 = MagicMock()
-        mock_page1.extract_text.return_value = "Page 1 content"
+        mock_page1.get_textpage.return_value.get_text_range.return_value = "Page 1 content"
         mock_page2 = MagicMock()
-        mock_page2.extract_text.return_value = "Page 2 content"
+        mock_page2.get_textpage.return_value.get_text_range.return_value = "Page 2\r\ncontent"
 
         mock_pdf = MagicMock()
-        mock_pdf.pages = [mock_page1, mock_page2]
-        mock_pdf.__enter__.return_value = mock_pdf
-        mock_pdf.__exit__.return_value = None
+        mock_pdf.__iter__.return_value = iter([mock_page1, mock_page2])
 
         mock_pdf_open.return_value = mock_pdf
 
-        # Mock file existence check
-        with patch("os.path.exists") as mock_exists:
-            mock_exists.return_value = True
+        # Execute
+        result = extract_text_from_pdf("dummy.pdf")
 
-            # Execute
-            result = extract_text_from_pdf("dummy.pdf")
+        # Assert
+        assert result == "Page 1 content\nPage 2\ncontent"
+        mock_pdf.close.assert_called_once()
+        mock_pdf_open.assert_called_once_with("dummy.pdf")
 
-            # Assert
-            assert result == "Page 1 content\nPage 2 content"
-            mock_pdf_open.assert_called_once_with("dummy.pdf")
+    @patch("misc.file_processor.extract_text_from_pdf")
+    def test_get_jd_text_cached(self, mock_extract_pdf, tmp_path):
+        """Test JD text is parsed once and re-parsed only when the JD changes."""
+        jd_file = tmp_path / "jd.pdf"
+        jd_file.write_bytes(b"%PDF-1.4")
+        mock_extract_pdf.return_value = "JD line 1\nJD line 2"
 
-    @patch("os.path.isfile")
-    @patch("os.listdir")
-    @patch("os.path.exists")
-    def test_get_cv_files(self, mock_exists, mock_listdir, mock_isfile):
-        """Test getting CV files from a folder."""
-        # Setup mocks
-        mock_exists.return_value = True
-        mock_listdir.return_value = ["cv1.pdf", "cv2.docx", "notes.txt", "image.jpg"]
+        # Execute twice
+        first = get_jd_text_cached(str(jd_file))
+        second = get_jd_text_cached(str(jd_file))
+
+        # Assert
+        assert first == second == "JD line 1\nJD line 2"
+        mock_extract_pdf.assert_called_once_with(str(jd_file))
+
+        # A changed JD is parsed again
+        jd_file.write_bytes(b"%PDF-1.4 updated")
+        mock_extract_pdf.return_value = "New JD"
+        assert get_jd_text_cached(str(jd_file)) == "New JD"
+        assert mock_extract_pdf.call_count == 2
 
-        # Make only the PDF and DOCX files return True for isfile
-        def is_file_side_effect(path):
-            return path.endswith((".pdf", ".docx"))
+        # So is a same-size JD replaced within the same second
+        mtime_ns = jd_file.stat().st_mtime_ns
+        jd_file.write_bytes(b"%PDF-1.4 UPDATED")
+        os.utime(jd_file, ns=(mtime_ns + 1000, mtime_ns + 1000))
+        mock_extract_pdf.return_value = "Newer JD"
+        assert get_jd_text_cached(str(jd_file)) == "Newer JD"
 
-        mock_isfile.side_effect = is_file_side_effect
+    def test_cv_hashes_round_trip(self, tmp_path):
+        """Test identical CV bytes hash the same and hashes persist per folder."""
+        cv1 = tmp_path / "cv1.pdf"
+        cv2 = tmp_path / "cv1 (copy).pdf"
+        cv1.write_bytes(b"same bytes")
+        cv2.write_bytes(b"same bytes")
+
+        assert hash_file(str(cv1)) == hash_file(str(cv2))
+        assert load_cv_hashes(str(tmp_path)) == {}
+
+        save_cv_hashes(str(tmp_path), {hash_file(str(cv1)): "cv1.pdf"})
+        assert load_cv_hashes(str(tmp_path)) == {hash_file(str(cv2)): "cv1.pdf"}
+
+    def test_processed_files_log(self, tmp_path):
+        """Test the per-position processed log is appended and read back."""
+        assert load_processed_files(str(tmp_path)) == set()
+
+        append_processed_files(str(tmp_path), ["cv1.pdf", "cv2.docx"])
+        append_processed_files(str(tmp_path), ["cv3.pdf"])
+
+        assert load_processed_files(str(tmp_path)) == {"cv1.pdf", "cv2.docx", "cv3.pdf"}
+
+    def test_get_cv_files(self, tmp_path):
+        """Test getting CV files from a folder."""
+        # Setup folder
+        for filename in ["cv1.pdf", "cv2.docx", "notes.txt", "image.jpg"]:
+            (tmp_path / filename).write_bytes(b"")
+        (tmp_path / "archive.pdf").mkdir()
 
         # Execute
-        result = get_cv_files("dummy_folder")
+        result = get_cv_files(str(tmp_path))
 
         # Assert
         assert len(result) == 2
-        assert os.path.join("dummy_folder", "cv1.pdf") in result
-        assert os.path.join("dummy_folder", "cv2.docx") in result
-        assert os.path.join("dummy_folder", "notes.txt") not in result
-        assert os.path.join("dummy_folder", "image.jpg") not in result
-
-    @patch("os.path.isfile")
-    @patch("os.listdir")
-    def test_get_cv_files_empty_folder(self, mock_listdir, mock_isfile):
-        """Test getting CV files from an empty folder."""
-        # Setup mocks
-        mock_listdir.return_value = []
-        mock_isfile.return_value = False
+        assert os.path.join(str(tmp_path), "cv1.pdf") in result
+        assert os.path.join(str(tmp_path), "cv2.docx") in result
+        assert os.path.join(str(tmp_path), "notes.txt") not in result
+        assert os.path.join(str(tmp_path), "image.jpg") not in result
+        assert os.path.join(str(tmp_path), "archive.pdf") not in result
 
+    def test_get_cv_files_empty_folder(self, tmp_path):
+        """Test getting CV files from an empty folder."""
         # Execute
-        result = get_cv_files("dummy_folder")
+        result = get_cv_files(str(tmp_path))
 
         # Assert
         assert result == []
 
-    @patch("os.path.isfile")
-    @patch("os.listdir")
-    def test_get_cv_files_no_supported_files(self, mock_listdir, mock_isfile):
+    def test_get_cv_files_missing_folder(self, tmp_path):
+        """Test getting CV files from a folder that does not exist."""
+        assert get_cv_files(str(tmp_path / "missing")) == []
+
+    def test_get_cv_files_no_supported_files(self, tmp_path):
         """Test getting CV files from a folder with no supported files."""
-        # Setup mocks
-        mock_listdir.return_value = ["notes.txt", "image.jpg"]
-        mock_isfile.return_value = True
+        # Setup folder
+        for filename in ["notes.txt", "image.jpg"]:
+            (tmp_path / filename).write_bytes(b"")
 
         # Execute
-        result = get_cv_files("dummy_folder")
+        result = get_cv_files(str(tmp_path))
 
         # Assert
         assert result == []
@@ -2,57 +2,73 @@
 Tests for Gemini API integration
 """
 
-import os
-import sys
-from unittest.mock import MagicMock
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import aiohttp
 import pytest
-from google.genai import types
+from google.genai import errors
 
-# Add src directory to path
-sys.path.insert(
-    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+from api.gemini import (
+    get_candidate_info,
+    get_candidates_info_batch,
+    verify_gemini_api_key,
 )
-
-from api.gemini import get_candidate_info
 from api.models import Candidate
-from core.gemini_processing import process_with_gemini
+from core.gemini_processing import analyze_cv
 
 
 class TestGeminiAPI:
     """Tests for Gemini API integration."""
 
-    sample_candidate_json = {
-        "full_name": "John Doe",
-        "email": "john.doe@example.com",
-        "contact_number": "+1234567890",
-        "date_of_birth": "1990-01-01",
-        "gender": "Male",
-        "linkedin_url": "https://linkedin.com/in/johndoe",
-        "years_of_experience": 5,
-        "experience_summary": "5 years of Python development experience",
-        "profile_summary": "Experienced software engineer",
-        "professional_skills": ["Python", "Django", "React"],
-        "personal_skills": ["Problem solving", "Communication"],
-        "match_score": 88,
-        "ranking_category": "High Fit",
-        "ranking_reason": "Strong match for requirements",
-        "job_location": "Singapore",
-        "job_position_title": "Senior Python Developer",
-    }
+    @pytest.mark.asyncio
+    async def test_verify_gemini_api_key_with_shared_session(self):
+        """Test verify_gemini_api_key reuses a provided session."""
+        # Setup mock response and session
+        mock_response = MagicMock()
+        mock_response.status = 200
+        mock_session = MagicMock()
+        mock_session.get.return_value.__aenter__ = AsyncMock(return_value=mock_response)
+        mock_session.get.return_value.__aexit__ = AsyncMock(return_value=None)
+
+        # Execute
+        result = await verify_gemini_api_key("test_key", session=mock_session)
+
+        # Assert
+        assert result is True
+        mock_session.get.assert_called_once()
+        assert mock_session.get.call_args[1]["headers"]["x-goog-api-key"] == "test_key"
+
+    @pytest.mark.asyncio
+    async def test_verify_gemini_api_key_invalid_key(self):
+        """Test verify_gemini_api_key raises a typed error on a rejected key."""
+        # Setup mock response and session
+        mock_response = MagicMock()
+        mock_response.raise_for_status.side_effect = aiohttp.ClientResponseError(
+            request_info=MagicMock(), history=(), status=400, message="Bad Request"
+        )
+        mock_session = MagicMock()
+        mock_session.get.return_value.__aenter__ = AsyncMock(return_value=mock_response)
+        mock_session.get.return_value.__aexit__ = AsyncMock(return_value=None)
+
+        # Execute and assert
+        with pytest.raises(aiohttp.ClientResponseError) as excinfo:
+            await verify_gemini_api_key("bad_key", session=mock_session)
+        assert excinfo.value.status == 400
 
     @pytest.mark.asyncio
     async def test_get_candidate_info(
-        self, mock_gemini_client, sample_cv_text, sample_jd_text
+        self,
+        mock_gemini_client,
+        sample_cv_text,
+        sample_jd_text,
+        sample_candidate,
     ):
         """Test get_candidate_info function."""
-        # Create a candidate instance from the sample data
-        candidate = Candidate(**self.sample_candidate_json)
+        candidate = sample_candidate
 
         # Setup mock response
-        mock_response = MagicMock(spec=types.GenerateContentResponse)
-        mock_response.text = self.sample_candidate_json
-        mock_response.parsed = candidate
+        mock_response = SimpleNamespace(parsed=candidate)
         mock_gemini_client.aio.models.generate_content.return_value = mock_response
 
         # Execute
@@ -70,87 +86,241 @@ class TestGeminiAPI:
         assert result.email == "john.doe@example.com"
         assert result.match_score == 88
 
+        # Verify the prompt was rendered with both texts
+        contents = mock_gemini_client.aio.models.generate_content.call_args[1]["contents"]
+        assert sample_cv_text in contents
+        assert sample_jd_text in contents
+        assert "$cv_text" not in contents
+
     @pytest.mark.asyncio
-    async def test_process_with_gemini(
-        self, mock_gemini_client, sample_jd_text, mock_console
+    async def test_get_candidate_info_uses_cache(
+        self, mock_gemini_client, sample_cv_text, sample_jd_text, sample_candidate
     ):
-        """Test process_with_gemini function."""
-        # Create a candidate instance from the sample data
-        candidate = Candidate(**self.sample_candidate_json)
+        """Test get_candidate_info serves repeated deterministic requests from cache."""
+        candidate = sample_candidate
+        mock_response = SimpleNamespace(parsed=candidate)
+        mock_gemini_client.aio.models.generate_content.return_value = mock_response
 
-        # Setup mock response
-        mock_response = MagicMock(spec=types.GenerateContentResponse)
-        mock_response.text = self.sample_candidate_json
-        mock_response.parsed = candidate
+        for _ in range(2):
+            result = await get_candidate_info(
+                cv_text=sample_cv_text,
+                jd_text=sample_jd_text,
+                client=mock_gemini_client,
+                model="gemini-2.0-flash",
+                temperature=0.0,
+            )
+            assert result == candidate
+
+        # Only the first call reaches the API
+        mock_gemini_client.aio.models.generate_content.assert_called_once()
+
+        # Non-deterministic requests always call the API
+        await get_candidate_info(
+            cv_text=sample_cv_text,
+            jd_text=sample_jd_text,
+            client=mock_gemini_client,
+            model="gemini-2.0-flash",
+            temperature=0.7,
+        )
+        assert mock_gemini_client.aio.models.generate_content.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_get_candidate_info_cache_can_be_disabled(
+        self, mock_gemini_client, sample_cv_text, sample_jd_text, sample_candidate,
+        monkeypatch, tmp_path,
+    ):
+        """Test RESUME_ANALYZER_NO_CACHE stops analyses from being read or written."""
+        monkeypatch.setenv("RESUME_ANALYZER_NO_CACHE", "1")
+        mock_response = SimpleNamespace(parsed=sample_candidate)
         mock_gemini_client.aio.models.generate_content.return_value = mock_response
 
-        # Sample CV data
-        cv_data = [
-            {
-                "file_name": "cv1.pdf",
-                "file_path": "path/to/cv1.pdf",
-                "text": "CV1 content",
-            },
+        for _ in range(2):
+            await get_candidate_info(
+                cv_text=sample_cv_text,
+                jd_text=sample_jd_text,
+                client=mock_gemini_client,
+                model="gemini-2.0-flash",
+                temperature=0.0,
+            )
+
+        assert mock_gemini_client.aio.models.generate_content.call_count == 2
+        assert not (tmp_path / "cache").exists()
+
+    @pytest.mark.asyncio
+    async def test_get_candidate_info_retries_rate_limit(
+        self, mock_gemini_client, sample_cv_text, sample_jd_text, sample_candidate
+    ):
+        """Test a 429 is retried after the delay Gemini asks for."""
+        rate_limited = errors.ClientError(
+            429,
             {
-                "file_name": "cv2.pdf",
-                "file_path": "path/to/cv2.pdf",
-                "text": "CV2 content",
+                "error": {
+                    "code": 429,
+                    "message": "Resource has been exhausted",
+                    "status": "RESOURCE_EXHAUSTED",
+                    "details": [
+                        {
+                            "@type": "type.googleapis.com/google.rpc.RetryInfo",
+                            "retryDelay": "0s",
+                        }
+                    ],
+                }
             },
+        )
+        mock_response = SimpleNamespace(parsed=sample_candidate)
+        mock_gemini_client.aio.models.generate_content.side_effect = [
+            rate_limited,
+            mock_response,
         ]
 
-        # Execute
-        results = await process_with_gemini(
-            cv_data=cv_data,
+        with patch("api.gemini.rprint"):
+            result = await get_candidate_info(
+                cv_text=sample_cv_text,
+                jd_text=sample_jd_text,
+                client=mock_gemini_client,
+                model="gemini-2.0-flash",
+                temperature=0.7,
+            )
+
+        assert result.full_name == "John Doe"
+        assert mock_gemini_client.aio.models.generate_content.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_get_candidate_info_does_not_retry_bad_request(
+        self, mock_gemini_client, sample_cv_text, sample_jd_text
+    ):
+        """Test a non-transient error fails without retrying."""
+        mock_gemini_client.aio.models.generate_content.side_effect = errors.ClientError(
+            400, {"error": {"code": 400, "message": "Invalid", "status": "INVALID_ARGUMENT"}}
+        )
+
+        with pytest.raises(errors.ClientError):
+            await get_candidate_info(
+                cv_text=sample_cv_text,
+                jd_text=sample_jd_text,
+                client=mock_gemini_client,
+                model="gemini-2.0-flash",
+                temperature=0.7,
+            )
+
+        assert mock_gemini_client.aio.models.generate_content.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_get_candidates_info_batch(
+        self, mock_gemini_client, sample_jd_text, sample_candidate
+    ):
+        """Test several CVs are analysed in one request, skipping cached ones."""
+        first = sample_candidate
+        second = first.model_copy(update={"full_name": "Jane Doe"})
+        third = first.model_copy(update={"full_name": "Jim Doe"})
+
+        mock_response = SimpleNamespace(parsed=[first, second])
+        mock_gemini_client.aio.models.generate_content.return_value = mock_response
+
+        result = await get_candidates_info_batch(
+            cv_texts=["CV one", "CV two"],
             jd_text=sample_jd_text,
-            gemini_client=mock_gemini_client,
+            client=mock_gemini_client,
             model="gemini-2.0-flash",
             temperature=0.0,
-            console=mock_console,
-            max_concurrent=2,
         )
 
-        # Assert
-        assert len(results) == 2
-        for result in results:
-            assert isinstance(result, dict)
-            assert "status" in result
-            assert "candidate" in result
-            assert isinstance(result["candidate"], Candidate)
-            assert result["candidate"].full_name == "John Doe"
-            assert result["candidate"].match_score == 88
+        assert [c.full_name for c in result] == ["John Doe", "Jane Doe"]
+        contents = mock_gemini_client.aio.models.generate_content.call_args[1]["contents"]
+        assert "[1]\nCV one" in contents
+        assert "[2]\nCV two" in contents
+        assert contents.count(sample_jd_text) == 1
+        assert "exactly 2 objects" in contents
+
+        # Cached CVs are left out of the next batch
+        mock_response.parsed = [third]
+        result = await get_candidates_info_batch(
+            cv_texts=["CV one", "CV three"],
+            jd_text=sample_jd_text,
+            client=mock_gemini_client,
+            model="gemini-2.0-flash",
+            temperature=0.0,
+        )
+
+        assert [c.full_name for c in result] == ["John Doe", "Jim Doe"]
+        contents = mock_gemini_client.aio.models.generate_content.call_args[1]["contents"]
+        assert "CV one" not in contents
+        assert "[1]\nCV three" in contents
+
+        # A batch result is not served to a request for the CV on its own
+        mock_gemini_client.aio.models.generate_content.return_value = SimpleNamespace(
+            parsed=second
+        )
+        result = await get_candidate_info(
+            cv_text="CV one",
+            jd_text=sample_jd_text,
+            client=mock_gemini_client,
+            model="gemini-2.0-flash",
+            temperature=0.0,
+        )
+
+        assert result.full_name == "Jane Doe"
 
     @pytest.mark.asyncio
-    async def test_process_with_gemini_error(
-        self, mock_gemini_client, sample_jd_text, mock_console
+    async def test_get_candidates_info_batch_count_mismatch(
+        self, mock_gemini_client, sample_jd_text, sample_candidate
     ):
-        """Test process_with_gemini function with an error."""
-        # Setup mock to raise an exception
+        """Test a batch response with the wrong number of candidates is rejected."""
+        mock_response = SimpleNamespace(parsed=[sample_candidate])
+        mock_gemini_client.aio.models.generate_content.return_value = mock_response
+
+        with pytest.raises(ValueError):
+            await get_candidates_info_batch(
+                cv_texts=["CV one", "CV two"],
+                jd_text=sample_jd_text,
+                client=mock_gemini_client,
+                model="gemini-2.0-flash",
+                temperature=0.7,
+            )
+
+    @pytest.mark.asyncio
+    async def test_analyze_cv(self, mock_gemini_client, sample_jd_text, sample_candidate):
+        """Test analyze_cv returns the candidate with the CV's file info."""
+        mock_response = SimpleNamespace(parsed=sample_candidate)
+        mock_gemini_client.aio.models.generate_content.return_value = mock_response
+        cv_item = {
+            "file_name": "cv1.pdf",
+            "file_path": "path/to/cv1.pdf",
+            "hash": "abc123",
+            "text": "CV1 content",
+        }
+
+        result = await analyze_cv(
+            cv_item=cv_item,
+            jd_text=sample_jd_text,
+            gemini_client=mock_gemini_client,
+            model="gemini-2.0-flash",
+            temperature=0.0,
+        )
+
+        assert result == {
+            "status": "success",
+            "file_name": "cv1.pdf",
+            "file_path": "path/to/cv1.pdf",
+            "hash": "abc123",
+            "candidate": sample_candidate,
+        }
+
+    @pytest.mark.asyncio
+    async def test_analyze_cv_error(self, mock_gemini_client, sample_jd_text):
+        """Test analyze_cv reports a failed Gemini call instead of raising."""
         mock_gemini_client.aio.models.generate_content.side_effect = Exception(
             "API error"
         )
+        cv_item = {"file_name": "cv1.pdf", "file_path": "path/to/cv1.pdf", "text": "CV1"}
 
-        # Sample CV data
-        cv_data = [
-            {
-                "file_name": "cv1.pdf",
-                "file_path": "path/to/cv1.pdf",
-                "text": "CV1 content",
-            },
-        ]
-
-        # Execute
-        result = await process_with_gemini(
-            cv_data=cv_data,
+        result = await analyze_cv(
+            cv_item=cv_item,
             jd_text=sample_jd_text,
             gemini_client=mock_gemini_client,
             model="gemini-2.0-flash",
             temperature=0.0,
-            console=mock_console,
-            max_concurrent=2,
         )
 
-        # Assert that no results were processed successfully
-        assert len(result) == 0
-
-        # Verify API call was attempted
+        assert result == {"status": "failed", "file_name": "cv1.pdf", "error": "API error"}
         mock_gemini_client.aio.models.generate_content.assert_called_once()
@@ -2,14 +2,13 @@
 Tests for the main module
 """
 
-import os
-import sys
+import runpy
+from pathlib import Path
 from unittest.mock import patch
 
-# Add src directory to path
-sys.path.insert(
-    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
-)
+import typer
+
+MAIN_PATH = Path(__file__).resolve().parent.parent / "src" / "main.py"
 
 
 class TestMain:
@@ -17,11 +16,6 @@ class TestMain:
 
     def test_main_import_functionality(self):
         """Test main module can import app module."""
-        # If the module is already imported, force a reload
-        if "src.main" in sys.modules:
-            del sys.modules["src.main"]
-
-        # Import the module
         from src import main
 
         # Verify that the module has the app attribute from the import
@@ -29,27 +23,9 @@ class TestMain:
 
     def test_main_entry_point(self):
         """Test main module calls app when run as __main__."""
-        # Save original name
-        if "src.main" in sys.modules:
-            original_name = sys.modules["src.main"].__name__
-            del sys.modules["src.main"]
-
-        # Setup mock
-        with (
-            patch("app.app") as mock_app,
-            patch.object(sys, "argv", ["app.py"]),
-        ):  # Mock sys.argv to avoid command processing
-            # Force reload
-            if "src.main" in sys.modules:
-                del sys.modules["src.main"]
-
-            # Import main module with a mock for __name__ to simulate being run as __main__
-            from importlib import util
-
-            spec = util.find_spec("src.main")
-            main = util.module_from_spec(spec)
-            main.__name__ = "__main__"
-
-            # Check that the app would be called but don't actually run it
-            # Assert that the condition for app execution is true
-            assert main.__name__ == "__main__"
+        # main.py may import the app as src.app or app; patching the Typer class
+        # intercepts the call whichever module object it ends up with
+        with patch.object(typer.Typer, "__call__") as mock_call:
+            runpy.run_path(str(MAIN_PATH), run_name="__main__")
+
+        mock_call.assert_called_once_with()
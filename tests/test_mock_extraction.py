@@ -3,144 +3,183 @@ Tests for the file extraction functionality
 """
 
 import os
-import sys
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-# Add src directory to path
-sys.path.insert(
-    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
-)
-
 from misc.file_processor import (
+    MIN_CV_LEADING_CHARS,
     extract_text_from_docx,
     extract_text_from_file,
     extract_text_from_pdf,
 )
 
 
+def _pdfium_page(text):
+    """Stub a PDFium page whose text page returns the given text."""
+    return SimpleNamespace(
+        get_textpage=lambda: SimpleNamespace(get_text_range=lambda: text)
+    )
+
+
 class TestFileExtraction:
     """Tests for file extraction functionality."""
 
-    @patch("misc.file_processor.pdfplumber.open")
+    @patch("misc.file_processor.pdfium.PdfDocument")
     def test_extract_text_from_pdf(self, mock_pdf_open):
         """Test extracting text from a PDF file."""
         # Setup mock PDF
-        mock_page1 = MagicMock()
-        mock_page1.extract_text.return_value = "Page 1 content"
-        mock_page2 = MagicMock()
-        mock_page2.extract_text.return_value = "Page 2 content"
-
         mock_pdf = MagicMock()
-        mock_pdf.pages = [mock_page1, mock_page2]
-        mock_pdf.__enter__.return_value = mock_pdf
-        mock_pdf.__exit__.return_value = None
+        mock_pdf.__iter__.return_value = iter(
+            [_pdfium_page("Page 1 content"), _pdfium_page("Page 2\r\ncontent")]
+        )
 
         mock_pdf_open.return_value = mock_pdf
 
-        # Mock file existence check
-        with patch("os.path.exists") as mock_exists:
-            mock_exists.return_value = True
-
-            # Execute
-            result = extract_text_from_pdf("dummy.pdf")
+        # Execute
+        result = extract_text_from_pdf("dummy.pdf")
 
-            # Assert
-            assert result == "Page 1 content\nPage 2 content"
-            mock_pdf_open.assert_called_once_with("dummy.pdf")
+        # Assert
+        assert result == "Page 1 content\nPage 2\ncontent"
+        mock_pdf.close.assert_called_once()
+        mock_pdf_open.assert_called_once_with("dummy.pdf")
 
-    @patch("misc.file_processor.pdfplumber.open")
+    @patch("misc.file_processor.pdfium.PdfDocument")
     def test_extract_text_from_empty_pdf(self, mock_pdf_open):
         """Test extracting text from an empty PDF file."""
         # Setup mock empty PDF
         mock_pdf = MagicMock()
-        mock_pdf.pages = []
-        mock_pdf.__enter__.return_value = mock_pdf
-        mock_pdf.__exit__.return_value = None
+        mock_pdf.__iter__.return_value = iter([])
 
         mock_pdf_open.return_value = mock_pdf
 
-        # Mock file existence check
-        with patch("os.path.exists") as mock_exists:
-            mock_exists.return_value = True
-
-            # Execute
-            result = extract_text_from_pdf("empty.pdf")
+        # Execute
+        result = extract_text_from_pdf("empty.pdf")
 
-            # Assert
-            assert result == ""
-            mock_pdf_open.assert_called_once_with("empty.pdf")
+        # Assert
+        assert result == ""
+        mock_pdf_open.assert_called_once_with("empty.pdf")
 
-    @patch("misc.file_processor.pdfplumber.open")
+    @patch("misc.file_processor.pdfium.PdfDocument")
     def test_extract_text_from_pdf_with_error(self, mock_pdf_open):
         """Test extracting text from a PDF with extraction errors."""
         # Setup mock to raise an exception
         mock_pdf_open.side_effect = Exception("PDF error")
 
-        # Mock file existence check
-        with patch("os.path.exists") as mock_exists:
-            mock_exists.return_value = True
+        # Execute and assert
+        with pytest.raises(ValueError) as excinfo:
+            extract_text_from_pdf("problematic.pdf")
+
+        assert "Error extracting text from PDF" in str(excinfo.value)
+        mock_pdf_open.assert_called_once_with("problematic.pdf")
+
+    @patch("misc.file_processor.pdfium.PdfDocument")
+    def test_extract_text_from_scanned_pdf(self, mock_pdf_open):
+        """Test a PDF without text on its leading pages is returned empty early."""
+        # Kept as a mock to assert the third page is never read
+        mock_page3 = MagicMock()
+
+        mock_pdf = MagicMock()
+        mock_pdf.__iter__.return_value = iter(
+            [_pdfium_page(" \r\n "), _pdfium_page("Page 2"), mock_page3]
+        )
+        mock_pdf_open.return_value = mock_pdf
 
-            # Execute and assert
-            with pytest.raises(ValueError) as excinfo:
-                extract_text_from_pdf("problematic.pdf")
+        result = extract_text_from_pdf("scanned.pdf", min_leading_chars=50)
 
-            assert "Error extracting text from PDF" in str(excinfo.value)
-            mock_pdf_open.assert_called_once_with("problematic.pdf")
+        assert result == ""
+        mock_page3.get_textpage.assert_not_called()
+        mock_pdf.close.assert_called_once()
 
-    def test_extract_text_from_pdf_file_not_found(self):
+    @patch("misc.file_processor.pdfium.PdfDocument")
+    def test_extract_text_from_pdf_with_cover_page(self, mock_pdf_open):
+        """Test a CV with a nearly blank cover page still has its text extracted."""
+        body = "Experienced engineer with ten years of backend work"
+        mock_pdf = MagicMock()
+        mock_pdf.__iter__.return_value = iter([_pdfium_page("Photo"), _pdfium_page(body)])
+        mock_pdf_open.return_value = mock_pdf
+
+        result = extract_text_from_pdf("cv.pdf", min_leading_chars=50)
+
+        assert result == f"Photo\n{body}"
+
+    @patch("misc.file_processor.PDF_BACKEND", "pdfplumber")
+    @patch("pdfplumber.open")
+    def test_extract_text_from_pdf_with_pdfplumber_backend(self, mock_pdf_open):
+        """Test the pdfplumber backend can be selected instead of PDFium."""
+        mock_pdf = MagicMock()
+        mock_pdf.pages = [
+            SimpleNamespace(extract_text=lambda: "Page 1 content"),
+            SimpleNamespace(extract_text=lambda: None),
+        ]
+        mock_pdf.__enter__.return_value = mock_pdf
+        mock_pdf_open.return_value = mock_pdf
+
+        result = extract_text_from_pdf("dummy.pdf")
+
+        assert result == "Page 1 content\n"
+        mock_pdf_open.assert_called_once_with("dummy.pdf")
+
+    def test_extract_text_from_pdf_file_not_found(self, monkeypatch):
         """Test extracting text from a non-existent PDF file."""
-        # Mock file existence check
-        with patch("os.path.exists") as mock_exists:
-            mock_exists.return_value = False
+        monkeypatch.setattr(os.path, "exists", lambda path: False)
+
+        with pytest.raises(FileNotFoundError) as excinfo:
+            extract_text_from_pdf("nonexistent.pdf")
+        assert "PDF file not found" in str(excinfo.value)
+
+    def test_extract_text_from_missing_files(self, tmp_path):
+        """Test missing files raise FileNotFoundError from the parser itself."""
+        with pytest.raises(FileNotFoundError, match="PDF file not found"):
+            extract_text_from_pdf(str(tmp_path / "missing.pdf"))
+        with pytest.raises(FileNotFoundError, match="DOCX file not found"):
+            extract_text_from_docx(str(tmp_path / "missing.docx"))
+
+    def test_extract_text_from_invalid_docx(self, tmp_path):
+        """Test a file that is not a DOCX package is reported as unreadable, not missing."""
+        docx_file = tmp_path / "cv.docx"
+        docx_file.write_bytes(b"not a zip archive")
 
-            with pytest.raises(FileNotFoundError) as excinfo:
-                extract_text_from_pdf("nonexistent.pdf")
-            assert "PDF file not found" in str(excinfo.value)
+        with pytest.raises(ValueError, match="Error extracting text from DOCX"):
+            extract_text_from_docx(str(docx_file))
 
     @patch("misc.file_processor.Document")
     def test_extract_text_from_docx(self, mock_document):
         """Test extracting text from a DOCX file."""
         # Setup mock document
-        mock_para1 = MagicMock()
-        mock_para1.text = "Paragraph 1"
-        mock_para2 = MagicMock()
-        mock_para2.text = "Paragraph 2"
+        mock_document.return_value = SimpleNamespace(
+            paragraphs=[SimpleNamespace(text="Paragraph 1"), SimpleNamespace(text="Paragraph 2")]
+        )
 
-        mock_doc = MagicMock()
-        mock_doc.paragraphs = [mock_para1, mock_para2]
-        mock_document.return_value = mock_doc
+        # Execute
+        result = extract_text_from_docx("dummy.docx")
 
-        # Mock file existence check
-        with patch("os.path.exists") as mock_exists:
-            mock_exists.return_value = True
+        # Assert
+        assert result == "Paragraph 1\nParagraph 2"
+        mock_document.assert_called_once_with("dummy.docx")
 
-            # Execute
-            result = extract_text_from_docx("dummy.docx")
+    @patch("misc.file_processor.Document")
+    def test_extract_text_from_docx_skips_blank_paragraphs(self, mock_document):
+        """Test blank spacer paragraphs are left out of the extracted text."""
+        mock_document.return_value = SimpleNamespace(
+            paragraphs=[SimpleNamespace(text=text) for text in ["Name", "", "Skills", ""]]
+        )
 
-            # Assert
-            assert result == "Paragraph 1\nParagraph 2"
-            mock_document.assert_called_once_with("dummy.docx")
+        assert extract_text_from_docx("spaced.docx") == "Name\nSkills"
 
     @patch("misc.file_processor.Document")
     def test_extract_text_from_empty_docx(self, mock_document):
         """Test extracting text from an empty DOCX file."""
         # Setup mock empty document
-        mock_doc = MagicMock()
-        mock_doc.paragraphs = []
-        mock_document.return_value = mock_doc
-
-        # Mock file existence check
-        with patch("os.path.exists") as mock_exists:
-            mock_exists.return_value = True
+        mock_document.return_value = SimpleNamespace(paragraphs=[])
 
-            # Execute
-            result = extract_text_from_docx("empty.docx")
+        # Execute
+        result = extract_text_from_docx("empty.docx")
 
-            # Assert
-            assert result == ""
-            mock_document.assert_called_once_with("empty.docx")
+        # Assert
+        assert result == ""
+        mock_document.assert_called_once_with("empty.docx")
 
     @patch("misc.file_processor.Document")
     def test_extract_text_from_docx_with_error(self, mock_document):
@@ -148,26 +187,20 @@ class TestFileExtraction:
         # Setup mock to raise an exception
         mock_document.side_effect = Exception("DOCX error")
 
-        # Mock file existence check
-        with patch("os.path.exists") as mock_exists:
-            mock_exists.return_value = True
-
-            # Execute and assert
-            with pytest.raises(ValueError) as excinfo:
-                extract_text_from_docx("problematic.docx")
+        # Execute and assert
+        with pytest.raises(ValueError) as excinfo:
+            extract_text_from_docx("problematic.docx")
 
-            assert "Error extracting text from DOCX" in str(excinfo.value)
-            mock_document.assert_called_once_with("problematic.docx")
+        assert "Error extracting text from DOCX" in str(excinfo.value)
+        mock_document.assert_called_once_with("problematic.docx")
 
-    def test_extract_text_from_docx_file_not_found(self):
+    def test_extract_text_from_docx_file_not_found(self, monkeypatch):
         """Test extracting text from a non-existent DOCX file."""
-        # Mock file existence check
-        with patch("os.path.exists") as mock_exists:
-            mock_exists.return_value = False
+        monkeypatch.setattr(os.path, "exists", lambda path: False)
 
-            with pytest.raises(FileNotFoundError) as excinfo:
-                extract_text_from_docx("nonexistent.docx")
-            assert "DOCX file not found" in str(excinfo.value)
+        with pytest.raises(FileNotFoundError) as excinfo:
+            extract_text_from_docx("nonexistent.docx")
+        assert "DOCX file not found" in str(excinfo.value)
 
     @patch("misc.file_processor.extract_text_from_pdf")
     def test_extract_text_from_file_pdf(self, mock_extract_pdf):
@@ -175,7 +208,9 @@ class TestFileExtraction:
         mock_extract_pdf.return_value = "PDF content"
         result = extract_text_from_file("test.pdf")
         assert result == "PDF content"
-        mock_extract_pdf.assert_called_once_with("test.pdf")
+        mock_extract_pdf.assert_called_once_with(
+            "test.pdf", min_leading_chars=MIN_CV_LEADING_CHARS
+        )
 
     @patch("misc.file_processor.extract_text_from_docx")
     def test_extract_text_from_file_docx(self, mock_extract_docx):
@@ -2,54 +2,38 @@
 Tests for Notion integration
 """
 
+import asyncio
 import os
-import sys
 import time
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
-from rich.console import Console
-
-# Add src directory to path
-sys.path.insert(
-    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
-)
+from aiolimiter import AsyncLimiter
+from notion_client.errors import APIErrorCode, APIResponseError, HTTPResponseError
 
 from api.models import Candidate
-from api.notion import NotionManager
-from core.notion_upload import upload_to_notion
+from api.notion import FileUploadError, NotionManager, _make_limiter
+from core.notion_upload import skip_known_duplicates, upload_candidate
+
+
+@pytest.fixture(scope="module")
+def sample_candidate(sample_candidate_json):
+    """Sample candidate built without validation; these tests only pass it to mocked Notion calls."""
+    return Candidate.model_construct(**sample_candidate_json)
 
 
 class TestNotionIntegration:
     """Tests for Notion integration."""
 
-    @pytest.fixture
-    def sample_candidate(self):
-        """Create a sample candidate for testing."""
-        return Candidate(
-            full_name="John Doe",
-            email="john.doe@example.com",
-            contact_number="+1234567890",
-            date_of_birth="1990-01-01",
-            gender="Male",
-            linkedin_url="https://linkedin.com/in/johndoe",
-            years_of_experience=5,
-            experience_summary="5 years of Python development experience",
-            profile_summary="Experienced software engineer with 5 years of experience in Python development.",
-            professional_skills=["Python", "Django", "React"],
-            personal_skills=["Problem solving", "Communication"],
-            match_score=88,
-            ranking_category="High Fit",
-            ranking_reason="The candidate has the required skills and experience for the role.",
-            job_location="Singapore",
-            job_position_title="Senior Python Developer",
-        )
-
     @pytest.mark.asyncio
     async def test_notion_manager_initialization(self):
         """Test NotionManager initialization with timezone."""
         # Create a mock client to prevent actual API calls
         mock_client = AsyncMock()
+        mock_client.databases.retrieve.return_value = {
+            "properties": {"Email": {"id": "email_prop_id", "type": "email"}}
+        }
 
         # Mock the NotionClient constructor
         with patch("api.notion.NotionClient", return_value=mock_client):
@@ -59,8 +43,8 @@ class TestNotionIntegration:
             )
 
             # Check if timezone was stored correctly - the timezone is converted to a timezone object
-            # so we check the timezone name instead of string equality
-            assert manager.timezone.zone == "Europe/Berlin"
+            # so we check the timezone key instead of string equality
+            assert manager.timezone.key == "Europe/Berlin"
 
             # Configure the manager
             configured_manager = await manager.configure()
@@ -74,161 +58,335 @@ class TestNotionIntegration:
 
             # Verify manager is returned for chaining
             assert configured_manager == manager
+            assert manager._email_property_id == "email_prop_id"
+            assert manager._processing_timestamp is not None
+
+            # Verify the Notion client and the shared upload session are closed
+            assert manager._session is not None
+            await manager.aclose()
+            assert manager._session.closed
+            mock_client.aclose.assert_awaited_once()
 
     @pytest.mark.asyncio
-    async def test_upload_to_notion(
-        self, mock_notion_manager, mock_console, sample_candidate
-    ):
-        """Test uploading candidates to Notion."""
-        # Create mock candidates
-        candidates = [
+    async def test_limiter_accepts_rate_below_one_per_second(self):
+        """Test a Notion request rate under 1/s spaces requests out instead of failing."""
+        limiter = _make_limiter(0.5)
+
+        await asyncio.wait_for(limiter.acquire(), timeout=1)
+
+        assert (limiter.max_rate, limiter.time_period) == (1, 2)
+        # Faster rates keep a one-second burst
+        limiter = _make_limiter(3)
+        assert (limiter.max_rate, limiter.time_period) == (3, 1)
+
+    @pytest.mark.asyncio
+    async def test_prefetch_existing_emails(self):
+        """Test prefetching existing emails across paginated results."""
+        manager = NotionManager(token="test_token", database_id="test_db")
+        manager.client = AsyncMock()
+        manager._email_property_id = "email_prop_id"
+        manager.client.databases.query.side_effect = [
             {
-                "status": "success",
-                "file_name": "cv1.pdf",
-                "file_path": "path/to/cv1.pdf",
-                "candidate": sample_candidate,
+                "results": [
+                    {"properties": {"Email": {"email": "john.doe@example.com"}}},
+                    {"properties": {"Email": {"email": None}}},
+                ],
+                "has_more": True,
+                "next_cursor": "cursor_1",
             },
             {
-                "status": "success",
-                "file_name": "cv2.pdf",
-                "file_path": "path/to/cv2.pdf",
-                "candidate": sample_candidate,
+                "results": [
+                    {"properties": {"Email": {"email": "Jane.Doe@Example.com"}}},
+                ],
+                "has_more": False,
+                "next_cursor": None,
             },
         ]
 
-        # Call the function
-        successful, duplicate, failed = await upload_to_notion(
-            candidates=candidates,
-            notion_manager=mock_notion_manager,
-            console=mock_console,
-            max_concurrent=2,
+        emails = await manager.prefetch_existing_emails()
+
+        assert emails == {"john.doe@example.com", "jane.doe@example.com"}
+        assert manager.client.databases.query.call_count == 2
+        second_call = manager.client.databases.query.call_args_list[1][1]
+        assert second_call["start_cursor"] == "cursor_1"
+        assert second_call["filter_properties"] == ["email_prop_id"]
+
+        # Duplicate checks are now answered without querying Notion
+        assert await manager.check_for_duplicate("john.doe@example.com") is True
+        assert await manager.check_for_duplicate("JOHN.DOE@example.com") is True
+        assert await manager.check_for_duplicate("jane.doe@example.com") is True
+        assert await manager.check_for_duplicate("new@example.com") is False
+        assert manager.client.databases.query.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_check_for_duplicate_query_is_bounded(self):
+        """Test the per-email duplicate query only asks for one minimal row."""
+        manager = NotionManager(token="test_token", database_id="test_db")
+        manager.client = AsyncMock()
+        manager._email_property_id = "email_prop_id"
+        manager.client.databases.query.return_value = {"results": [{"id": "page"}]}
+
+        assert await manager.check_for_duplicate("john.doe@example.com") is True
+
+        query_kwargs = manager.client.databases.query.call_args[1]
+        assert query_kwargs["page_size"] == 1
+        assert query_kwargs["filter_properties"] == ["email_prop_id"]
+
+    @pytest.mark.asyncio
+    async def test_create_candidate_row_retries_rate_limit(self, sample_candidate):
+        """Test create_candidate_row retries a 429 honouring Retry-After."""
+        manager = NotionManager(token="test_token", database_id="test_db")
+        manager.client = AsyncMock()
+        manager.upload_file_to_notion = AsyncMock(return_value={"id": "upload_id"})
+        rate_limited = HTTPResponseError(
+            httpx.Response(429, headers={"Retry-After": "0"})
         )
+        manager.client.pages.create.side_effect = [rate_limited, {"id": "page_id"}]
 
-        # Verify result
-        assert successful == 2
-        assert duplicate == 0
-        assert failed == 0
+        with patch("api.notion.rprint"):
+            page_id = await manager.create_candidate_row(
+                candidate=sample_candidate, cv_filepath="path/to/cv1.pdf"
+            )
 
-        # Verify calls to the notion manager
-        assert mock_notion_manager.check_for_duplicate.call_count == 2
-        assert mock_notion_manager.create_candidate_row.call_count == 2
+        assert page_id == "page_id"
+        assert manager.client.pages.create.call_count == 2
+        # The CV upload is not repeated when only page creation is retried
+        manager.upload_file_to_notion.assert_called_once_with("path/to/cv1.pdf")
+
+    @pytest.mark.asyncio
+    async def test_create_candidate_row_records_cv_hash(self, sample_candidate):
+        """Test the CV hash is stored and then recognised as already uploaded."""
+        manager = NotionManager(token="test_token", database_id="test_db")
+        manager.client = AsyncMock()
+        manager.upload_file_to_notion = AsyncMock(return_value={"id": "upload_id"})
+        manager.client.pages.create.return_value = {"id": "page_id"}
+        manager.client.databases.query.return_value = {"results": [], "has_more": False}
+        manager._cv_hash_property_id = "hash_prop_id"
+        await manager.prefetch_existing_emails()
+
+        assert await manager.check_for_hash("abc123") is False
+        await manager.create_candidate_row(
+            candidate=sample_candidate, cv_filepath="path/to/cv1.pdf", cv_hash="abc123"
+        )
+
+        properties = manager.client.pages.create.call_args[1]["properties"]
+        assert properties["CV Hash"]["rich_text"][0]["text"]["content"] == "abc123"
+        assert await manager.check_for_hash("abc123") is True
+        assert manager.client.databases.query.call_count == 1
 
     @pytest.mark.asyncio
-    async def test_upload_to_notion_with_duplicate(
-        self, mock_notion_manager, mock_console, sample_candidate
+    async def test_check_for_hash_without_property(self):
+        """Test hash checks are skipped for databases without a CV Hash property."""
+        manager = NotionManager(token="test_token", database_id="test_db")
+        manager.client = AsyncMock()
+
+        assert await manager.check_for_hash("abc123") is False
+        manager.client.databases.query.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_create_candidate_row_is_rate_limited(self, sample_candidate):
+        """Test concurrent page creates are paced by the shared request limiter."""
+        manager = NotionManager(token="test_token", database_id="test_db")
+        manager.client = AsyncMock()
+        manager.upload_file_to_notion = AsyncMock(return_value={"id": "upload_id"})
+        manager.client.pages.create.return_value = {"id": "page_id"}
+        # One request per 50ms, with no initial burst beyond the first
+        manager._limiter = AsyncLimiter(1, 0.05)
+
+        start = time.perf_counter()
+        page_ids = await asyncio.gather(
+            *[
+                manager.create_candidate_row(
+                    candidate=sample_candidate, cv_filepath="path/to/cv1.pdf"
+                )
+                for _ in range(4)
+            ]
+        )
+        elapsed = time.perf_counter() - start
+
+        assert page_ids == ["page_id"] * 4
+        assert manager.client.pages.create.call_count == 4
+        assert elapsed >= 0.14
+
+    @pytest.mark.asyncio
+    async def test_create_candidate_row_does_not_retry_validation_error(
+        self, sample_candidate
     ):
-        """Test uploading candidates to Notion with duplicates."""
-        # Setup mocks
-        mock_console = MagicMock(spec=Console)
-        # Add required attributes for Rich Progress
-        mock_console.get_time = MagicMock(return_value=time.monotonic())
-        mock_console.is_jupyter = False
-        mock_console.is_interactive = True
-
-        mock_notion_manager.check_for_duplicate.side_effect = [True, False]
-
-        # Create mock candidates
-        candidates = [
-            {
-                "status": "success",
-                "file_name": "cv1.pdf",
-                "file_path": "path/to/cv1.pdf",
-                "candidate": sample_candidate,
-            },
-        ]
+        """Test create_candidate_row gives up immediately on a non-transient error."""
+        manager = NotionManager(token="test_token", database_id="test_db")
+        manager.client = AsyncMock()
+        manager.upload_file_to_notion = AsyncMock(return_value={"id": "upload_id"})
+        manager.client.pages.create.side_effect = APIResponseError(
+            httpx.Response(400), "Invalid property", APIErrorCode.ValidationError
+        )
+
+        with patch("api.notion.rprint"):
+            page_id = await manager.create_candidate_row(
+                candidate=sample_candidate, cv_filepath="path/to/cv1.pdf"
+            )
+
+        assert page_id is None
+        assert manager.client.pages.create.call_count == 1
 
-        # Call the function
-        successful, duplicate, failed = await upload_to_notion(
-            candidates=candidates,
-            notion_manager=mock_notion_manager,
-            console=mock_console,
-            max_concurrent=2,
+    @pytest.mark.asyncio
+    async def test_upload_cv_file_retries_only_transient_errors(self):
+        """Test a rate-limited CV upload is retried but a rejected one is not."""
+        manager = NotionManager(token="test_token", database_id="test_db")
+        manager.upload_file_to_notion = AsyncMock(
+            side_effect=[
+                FileUploadError("rate limited", status=429, headers={"Retry-After": "0"}),
+                {"id": "upload_id"},
+            ]
         )
 
-        # Verify result
-        assert successful == 0
-        assert duplicate == 1
-        assert failed == 0
+        with patch("api.notion.rprint"):
+            assert await manager._upload_cv_file("path/to/cv1.pdf") == {"id": "upload_id"}
+        assert manager.upload_file_to_notion.call_count == 2
 
-        # Verify calls to the notion manager
-        assert mock_notion_manager.check_for_duplicate.call_count == 1
-        assert mock_notion_manager.create_candidate_row.call_count == 0
+        manager.upload_file_to_notion = AsyncMock(
+            side_effect=FileUploadError("bad request", status=400)
+        )
+        with pytest.raises(FileUploadError):
+            await manager._upload_cv_file("path/to/cv1.pdf")
+        manager.upload_file_to_notion.assert_called_once()
 
     @pytest.mark.asyncio
-    async def test_upload_to_notion_with_failure(
-        self, mock_notion_manager, mock_console, sample_candidate
+    async def test_create_candidate_row_missing_cv_file_fails_once(
+        self, sample_candidate, tmp_path
     ):
-        """Test uploading candidates to Notion with failures."""
-        # Setup mocks
-        mock_console = MagicMock(spec=Console)
-        # Add required attributes for Rich Progress
-        mock_console.get_time = MagicMock(return_value=time.monotonic())
-        mock_console.is_jupyter = False
-        mock_console.is_interactive = True
-
-        mock_notion_manager.check_for_duplicate.return_value = False
-        mock_notion_manager.create_candidate_row.side_effect = [None, "page_id"]
-
-        # Create mock candidates
-        candidates = [
-            {
-                "status": "success",
-                "file_name": "cv1.pdf",
-                "file_path": "path/to/cv1.pdf",
-                "candidate": sample_candidate,
-            },
-        ]
+        """Test a CV file that cannot be read fails without retries or upload requests."""
+        manager = NotionManager(token="test_token", database_id="test_db")
+        manager.client = AsyncMock()
+        manager._session = MagicMock()
+
+        with (
+            patch("api.notion.os.path.getsize", wraps=os.path.getsize) as mock_getsize,
+            patch("api.notion.rprint"),
+        ):
+            page_id = await manager.create_candidate_row(
+                candidate=sample_candidate, cv_filepath=str(tmp_path / "missing.pdf")
+            )
 
-        # Call the function
-        successful, duplicate, failed = await upload_to_notion(
-            candidates=candidates,
-            notion_manager=mock_notion_manager,
-            console=mock_console,
-            max_concurrent=2,
+        assert page_id is None
+        mock_getsize.assert_called_once()
+        manager._session.post.assert_not_called()
+        manager.client.pages.create.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_upload_candidate(self, mock_notion_manager, sample_candidate):
+        """Test uploading a candidate to Notion."""
+        candidate_item = {
+            "status": "success",
+            "file_name": "cv1.pdf",
+            "file_path": "path/to/cv1.pdf",
+            "hash": "abc123",
+            "candidate": sample_candidate,
+        }
+
+        result = await upload_candidate(candidate_item, mock_notion_manager)
+
+        assert result == {"status": "success", "file_name": "cv1.pdf"}
+        mock_notion_manager.check_for_duplicate.assert_called_once_with(sample_candidate.email)
+        mock_notion_manager.create_candidate_row.assert_called_once_with(
+            candidate=sample_candidate, cv_filepath="path/to/cv1.pdf", cv_hash="abc123"
         )
 
-        # Verify result
-        assert successful == 0
-        assert duplicate == 0
-        assert failed == 1
+    @pytest.mark.asyncio
+    async def test_upload_candidate_with_duplicate(
+        self, mock_notion_manager, sample_candidate
+    ):
+        """Test a candidate already in Notion is skipped."""
+        mock_notion_manager.check_for_duplicate.return_value = True
+        candidate_item = {
+            "status": "success",
+            "file_name": "cv1.pdf",
+            "file_path": "path/to/cv1.pdf",
+            "candidate": sample_candidate,
+        }
+
+        with patch("core.notion_upload.rprint"):
+            result = await upload_candidate(candidate_item, mock_notion_manager)
+
+        assert result == {"status": "duplicate", "file_name": "cv1.pdf"}
+        mock_notion_manager.create_candidate_row.assert_not_called()
 
-        # Verify calls to the notion manager
-        assert mock_notion_manager.check_for_duplicate.call_count == 1
-        assert mock_notion_manager.create_candidate_row.call_count == 1
+    @pytest.mark.asyncio
+    async def test_upload_candidate_with_failure(self, mock_notion_manager, sample_candidate):
+        """Test a candidate whose Notion page is not created is reported as failed."""
+        mock_notion_manager.create_candidate_row.return_value = None
+        candidate_item = {
+            "status": "success",
+            "file_name": "cv1.pdf",
+            "file_path": "path/to/cv1.pdf",
+            "candidate": sample_candidate,
+        }
+
+        result = await upload_candidate(candidate_item, mock_notion_manager)
+
+        assert result == {
+            "status": "failed",
+            "file_name": "cv1.pdf",
+            "error": "Failed to create Notion page",
+        }
 
     @pytest.mark.asyncio
-    async def test_upload_to_notion_with_api_exception(
-        self, mock_notion_manager, mock_console, sample_candidate
+    async def test_upload_candidate_with_api_exception(
+        self, mock_notion_manager, sample_candidate
     ):
-        """Test upload_to_notion function with an API exception."""
-        # Configure mock to raise an exception
-        mock_notion_manager.check_for_duplicate = AsyncMock(
-            side_effect=Exception("API error")
-        )
+        """Test an API exception is reported as a failed upload instead of raising."""
+        mock_notion_manager.check_for_duplicate.side_effect = Exception("API error")
+        candidate_item = {
+            "status": "success",
+            "file_name": "cv1.pdf",
+            "file_path": "path/to/cv1.pdf",
+            "candidate": sample_candidate,
+        }
+
+        result = await upload_candidate(candidate_item, mock_notion_manager)
 
-        # Sample candidates data
-        candidates = [
+        assert result == {"status": "failed", "file_name": "cv1.pdf", "error": "API error"}
+
+    @pytest.mark.asyncio
+    async def test_skip_known_duplicates(self, mock_notion_manager):
+        """Test CVs with an email already in Notion are dropped before Gemini."""
+        mock_notion_manager.check_for_duplicate.side_effect = (
+            lambda email: email == "john.doe@example.com"
+        )
+        cv_data = [
+            {"file_name": "cv1.pdf", "file_path": "cv1.pdf", "text": "john.doe@example.com"},
+            {"file_name": "cv2.pdf", "file_path": "cv2.pdf", "text": "jane@example.com"},
+            {"file_name": "cv3.pdf", "file_path": "cv3.pdf", "text": "No email"},
+            # Left for the check on the email Gemini extracts
             {
-                "status": "success",
-                "file_name": "cv1.pdf",
-                "file_path": "path/to/cv1.pdf",
-                "candidate": sample_candidate,
+                "file_name": "cv4.pdf",
+                "file_path": "cv4.pdf",
+                "text": "jim@example.com\nReferee: john.doe@example.com",
             },
         ]
 
-        # Execute
-        successful, duplicate, failed = await upload_to_notion(
-            candidates=candidates,
-            notion_manager=mock_notion_manager,
-            console=mock_console,
-            max_concurrent=2,
-        )
+        with patch("core.notion_upload.rprint"):
+            remaining, duplicates = await skip_known_duplicates(
+                cv_data, mock_notion_manager
+            )
 
-        # Assert
-        assert successful == 0
-        assert duplicate == 0
-        assert failed == 1
+        assert [item["file_name"] for item in remaining] == ["cv2.pdf", "cv3.pdf", "cv4.pdf"]
+        assert duplicates == ["cv1.pdf"]
+        assert mock_notion_manager.check_for_duplicate.call_count == 2
 
-        # Verify Notion API calls
-        mock_notion_manager.check_for_duplicate.assert_called_once()
-        mock_notion_manager.create_candidate_row.assert_not_called()
+    @pytest.mark.asyncio
+    async def test_skip_known_duplicates_by_cv_hash(self, mock_notion_manager):
+        """Test CVs whose file hash is already in Notion are dropped before the email check."""
+        mock_notion_manager.check_for_hash.side_effect = lambda cv_hash: cv_hash == "known"
+        cv_data = [
+            {"file_name": "cv1.pdf", "file_path": "cv1.pdf", "hash": "known", "text": "a@example.com"},
+            {"file_name": "cv2.pdf", "file_path": "cv2.pdf", "hash": "new", "text": "b@example.com"},
+        ]
+
+        with patch("core.notion_upload.rprint"):
+            remaining, duplicates = await skip_known_duplicates(
+                cv_data, mock_notion_manager
+            )
+
+        assert [item["file_name"] for item in remaining] == ["cv2.pdf"]
+        assert duplicates == ["cv1.pdf"]
+        mock_notion_manager.check_for_duplicate.assert_called_once_with("b@example.com")
@@ -0,0 +1,193 @@
+"""
+Tests for the per-CV processing pipeline
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core.pipeline import process_cvs
+from misc.file_processor import load_processed_files
+
+
+class TestPipeline:
+    """Tests for the per-CV pipeline."""
+
+    @pytest.mark.asyncio
+    async def test_process_cvs(
+        self,
+        mocker,
+        mock_gemini_client,
+        mock_notion_manager,
+        mock_console,
+        sample_jd_text,
+        sample_candidate,
+    ):
+        """Test each CV flows through Gemini and Notion with per-CV outcomes."""
+        mocker.patch("core.pipeline.rprint")
+        mock_response = SimpleNamespace(parsed=sample_candidate)
+        mock_gemini_client.aio.models.generate_content.side_effect = [
+            mock_response,
+            Exception("API error"),
+            mock_response,
+        ]
+        mock_notion_manager.check_for_duplicate.side_effect = [False, True]
+
+        cv_data = [
+            {"file_name": f"cv{i}.pdf", "file_path": f"path/to/cv{i}.pdf", "text": f"CV{i} content"}
+            for i in range(1, 4)
+        ]
+
+        # Execute
+        (
+            successful,
+            duplicate,
+            failed,
+            successful_list,
+            failed_list,
+            duplicate_list,
+        ) = await process_cvs(
+            cv_data=cv_data,
+            jd_text=sample_jd_text,
+            gemini_client=mock_gemini_client,
+            notion_manager=mock_notion_manager,
+            model="gemini-2.0-flash",
+            temperature=0.7,
+            console=mock_console,
+            max_gemini_concurrent=1,
+            max_notion_concurrent=1,
+        )
+
+        # Assert
+        assert (successful, duplicate, failed) == (1, 1, 1)
+        assert successful_list == ["cv1.pdf"]
+        assert failed_list == ["cv2.pdf"]
+        assert duplicate_list == ["cv3.pdf"]
+        assert mock_notion_manager.create_candidate_row.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_process_cvs_logs_each_upload(
+        self,
+        mocker,
+        mock_gemini_client,
+        mock_notion_manager,
+        mock_console,
+        sample_jd_text,
+        sample_candidate,
+        tmp_path,
+    ):
+        """Test successful uploads are written to the processed files log as they finish."""
+        mocker.patch("core.pipeline.rprint")
+        mock_response = SimpleNamespace(parsed=sample_candidate)
+        mock_gemini_client.aio.models.generate_content.return_value = mock_response
+        mock_notion_manager.create_candidate_row.side_effect = ["page_id", None, "page_id"]
+
+        cv_data = [
+            {"file_name": f"cv{i}.pdf", "file_path": f"path/to/cv{i}.pdf", "text": f"CV{i} content"}
+            for i in range(1, 4)
+        ]
+
+        result = await process_cvs(
+            cv_data=cv_data,
+            jd_text=sample_jd_text,
+            gemini_client=mock_gemini_client,
+            notion_manager=mock_notion_manager,
+            model="gemini-2.0-flash",
+            temperature=0.7,
+            console=mock_console,
+            max_gemini_concurrent=1,
+            max_notion_concurrent=1,
+            processed_dir=str(tmp_path),
+        )
+
+        assert result[:3] == (2, 0, 1)
+        assert load_processed_files(str(tmp_path)) == {"cv1.pdf", "cv3.pdf"}
+
+    @pytest.mark.asyncio
+    async def test_process_cvs_empty_input(
+        self, mocker, mock_gemini_client, mock_notion_manager, mock_console
+    ):
+        """Test the pipeline with no CVs."""
+        mocker.patch("core.pipeline.rprint")
+        result = await process_cvs(
+            cv_data=[],
+            jd_text="JD",
+            gemini_client=mock_gemini_client,
+            notion_manager=mock_notion_manager,
+            model="gemini-2.0-flash",
+            temperature=0.0,
+            console=mock_console,
+        )
+
+        assert result == (0, 0, 0, [], [], [])
+        mock_gemini_client.aio.models.generate_content.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_process_cvs_batch_falls_back_per_cv(
+        self,
+        mocker,
+        mock_gemini_client,
+        mock_notion_manager,
+        mock_console,
+        sample_jd_text,
+        sample_candidate,
+    ):
+        """Test a failed batch request is retried one CV at a time."""
+        mocker.patch("core.pipeline.rprint")
+        mocker.patch("core.gemini_processing.rprint")
+        single_response = SimpleNamespace(parsed=sample_candidate)
+        mock_gemini_client.aio.models.generate_content.side_effect = [
+            Exception("Invalid JSON"),
+            single_response,
+            single_response,
+        ]
+        mock_notion_manager.check_for_duplicate.return_value = False
+
+        cv_data = [
+            {"file_name": f"cv{i}.pdf", "file_path": f"path/to/cv{i}.pdf", "text": f"CV{i} content"}
+            for i in range(1, 3)
+        ]
+
+        result = await process_cvs(
+            cv_data=cv_data,
+            jd_text=sample_jd_text,
+            gemini_client=mock_gemini_client,
+            notion_manager=mock_notion_manager,
+            model="gemini-2.0-flash",
+            temperature=0.7,
+            console=mock_console,
+            gemini_batch_size=2,
+        )
+
+        assert result[0] == 2
+        assert sorted(result[3]) == ["cv1.pdf", "cv2.pdf"]
+        assert mock_gemini_client.aio.models.generate_content.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_process_cvs_worker_crash_does_not_hang(
+        self, mocker, mock_gemini_client, mock_notion_manager, mock_console
+    ):
+        """Test an unexpected worker error propagates instead of stalling the Notion stage."""
+        mocker.patch("core.pipeline.rprint")
+        mocker.patch("core.pipeline.analyze_cv", side_effect=RuntimeError("boom"))
+        cv_data = [
+            {"file_name": f"cv{i}.pdf", "file_path": f"path/to/cv{i}.pdf", "text": f"CV{i} content"}
+            for i in range(1, 4)
+        ]
+
+        with pytest.raises(ExceptionGroup):
+            await asyncio.wait_for(
+                process_cvs(
+                    cv_data=cv_data,
+                    jd_text="JD",
+                    gemini_client=mock_gemini_client,
+                    notion_manager=mock_notion_manager,
+                    model="gemini-2.0-flash",
+                    temperature=0.0,
+                    console=mock_console,
+                ),
+                timeout=5,
+            )
+
+        mock_notion_manager.create_candidate_row.assert_not_called()
@@ -2,165 +2,310 @@
 Tests for the process command module
 """
 
-import os
-import sys
-from unittest.mock import ANY, AsyncMock, MagicMock, patch
+from operator import attrgetter
+from unittest.mock import ANY, call
 
 import pytest
 import typer
 
-# Add src directory to path
-sys.path.insert(
-    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
-)
+from commands.process import CV_FOLDER_NAME, hash_file, process_command
+from misc.file_processor import load_processed_files
 
-from commands.process import process_command
+MOCK_CONFIG = {
+    "GEMINI_API_KEY": "test_key",
+    "NOTION_API_KEY": "test_key",
+    "NOTION_DATABASE_ID": "test_db",
+    "GEMINI_MODEL": "test_model",
+    "TEMPERATURE": 0.5,
+    "TIMEZONE": "UTC",
+}
+
+MOCK_CV_DATA = [
+    {"file_name": "cv1.pdf", "text": "CV 1 Text"},
+    {"file_name": "cv2.pdf", "text": "CV 2 Text"},
+]
+
+
+@pytest.fixture
+def position_folder(tmp_path, monkeypatch):
+    """A jobs folder holding one position with a JD and an empty CVs folder."""
+    # Keep the legacy processed files log lookup out of the real working directory
+    monkeypatch.chdir(tmp_path)
+    position = tmp_path / "jobs" / "Backend Engineer"
+    (position / CV_FOLDER_NAME).mkdir(parents=True)
+    (position / "jd.pdf").write_bytes(b"JD")
+    return position
 
 
 class TestProcessCommand:
     """Tests for process command."""
 
     @pytest.mark.asyncio
-    @patch("commands.process.extract_text_from_pdf")
-    @patch("commands.process.get_cv_files")
-    @patch("commands.process.format_cv_files")
-    @patch("commands.process.extract_cv_text")
-    @patch("commands.process.process_with_gemini")
-    @patch("commands.process.upload_to_notion")
-    @patch("commands.process.format_processing_stats")
-    @patch("commands.process.NotionManager")
-    @patch("commands.process.genai.Client")
-    @patch("commands.process.verify_gemini_api_key")
-    @patch("commands.process.get_config")
-    @patch("commands.process.rprint")
     async def test_process_command_success(
-        self,
-        mock_rprint,
-        mock_get_config,
-        mock_verify_gemini,
-        mock_gemini_client,
-        mock_notion_manager,
-        mock_format_stats,
-        mock_upload,
-        mock_process,
-        mock_extract,
-        mock_format_cv_files,
-        mock_get_files,
-        mock_extract_pdf,
+        self, patched_process, notion_mock, mock_console, position_folder
     ):
         """Test successful process command execution."""
         # Setup mocks
-        mock_get_config.return_value = {
-            "GEMINI_API_KEY": "test_key",
-            "NOTION_API_KEY": "test_key",
-            "NOTION_DATABASE_ID": "test_db",
-            "GEMINI_MODEL": "test_model",
-            "TEMPERATURE": 0.5,
-            "TIMEZONE": "UTC",
-        }
-        mock_extract_pdf.return_value = "JD Text"
+        patched_process.get_config.return_value = MOCK_CONFIG
+        patched_process.NotionManager.return_value = notion_mock
+        patched_process.get_jd_text_cached.return_value = "JD Text"
 
-        mock_get_files.return_value = ["cv1.pdf", "cv2.pdf"]
-        mock_format_cv_files.return_value = [
-            {"file_path": "cv1.pdf", "file_name": "cv1.pdf"},
-            {"file_path": "cv2.pdf", "file_name": "cv2.pdf"},
-        ]
+        for index in (1, 2):
+            (position_folder / CV_FOLDER_NAME / f"cv{index}.pdf").write_bytes(
+                f"CV {index}".encode()
+            )
+        # Not a CV, so not counted in the totals
+        (position_folder / CV_FOLDER_NAME / "notes.txt").write_text("notes")
+        patched_process.extract_cv_text.return_value = MOCK_CV_DATA
+        patched_process.skip_known_duplicates.return_value = (MOCK_CV_DATA, [])
+        patched_process.process_cvs.return_value = (
+            2, 0, 0, ["cv1.pdf", "cv2.pdf"], [], []
+        )
+        patched_process.format_processing_stats.return_value = "Stats"
 
-        mock_extract.return_value = [
-            {"file_name": "cv1.pdf", "text": "CV 1 Text"},
-            {"file_name": "cv2.pdf", "text": "CV 2 Text"},
-        ]
+        # Call function
+        await process_command(
+            jobs_folder=str(position_folder.parent),
+            notion_db_id="test_db",
+            notion_api_key="test_key",
+            gemini_api_key="test_key",
+            gemini_model="test_model",
+            gemini_temperature=0.5,
+            max_gemini_concurrent=5,
+            max_notion_concurrent=3,
+            timezone="Europe/London",
+            console=mock_console,
+        )
+
+        # Verify calls, each made exactly once with these arguments
+        expected_calls = {
+            "get_config": [
+                call("test_db", "test_key", "test_key", "test_model", 0.5, "Europe/London")
+            ],
+            "verify_gemini_api_key": [call("test_key")],
+            "genai.Client": [call(api_key="test_key", http_options=ANY)],
+            # NotionManager is initialized with the configured timezone
+            "NotionManager": [call(token="test_key", database_id="test_db", timezone="UTC")],
+            "get_jd_text_cached": [call(str(position_folder / "jd.pdf"))],
+            "format_processing_stats": [
+                call(
+                    total_files=2,
+                    processed_files=2,
+                    successful_files=2,
+                    duplicate_files=0,
+                    failed_files=0,
+                    notion_db_id="test_db",
+                )
+            ],
+        }
+        assert {
+            name: attrgetter(name)(patched_process).call_args_list for name in expected_calls
+        } == expected_calls
+
+        patched_process.extract_cv_text.assert_awaited_once()
+        patched_process.process_cvs.assert_awaited_once()
+        assert patched_process.process_cvs.await_args.kwargs["processed_dir"] == str(
+            position_folder
+        )
+        notion_mock.aclose.assert_awaited_once()
 
-        mock_process.return_value = [MagicMock(), MagicMock()]
-        mock_upload.return_value = (2, 0, 0)  # successful, duplicate, failed
-        mock_format_stats.return_value = "Stats"
-
-        # Mock NotionManager
-        notion_instance = AsyncMock()
-        notion_instance.configure.return_value = notion_instance
-        mock_notion_manager.return_value = notion_instance
-
-        # Set up patch for os.path.exists and os.listdir
-        with (
-            patch("os.path.exists", return_value=True),
-            patch("os.listdir", return_value=["cv1.pdf", "cv2.pdf"]),
-        ):
-            # Call function
+    @pytest.mark.asyncio
+    async def test_process_command_missing_folder(self, patched_process):
+        """Test process command with missing jobs folder."""
+        with pytest.raises(typer.Exit):
             await process_command(
-                cv_folder="test_folder",
-                jd_file="test_jd.pdf",
-                notion_db_id="test_db",
-                notion_api_key="test_key",
-                gemini_api_key="test_key",
-                gemini_model="test_model",
-                gemini_temperature=0.5,
-                max_gemini_concurrent=5,
-                max_notion_concurrent=3,
-                timezone="Europe/London",
+                jobs_folder="nonexistent_folder",
+                notion_db_id=None,
+                notion_api_key=None,
+                gemini_api_key=None,
+                gemini_model=None,
+                gemini_temperature=None,
+            )
+
+        assert "not a valid directory" in patched_process.rprint.call_args.args[0]
+        patched_process.get_config.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_process_command_no_cv_files(
+        self, patched_process, notion_mock, mock_console, position_folder
+    ):
+        """Test process command with a position whose CVs folder is empty."""
+        # Folders under dot-folders are never treated as positions
+        hidden = position_folder / ".extraction_cache" / "Old Position"
+        (hidden / CV_FOLDER_NAME).mkdir(parents=True)
+        (hidden / "jd.pdf").write_bytes(b"JD")
+        patched_process.get_config.return_value = MOCK_CONFIG
+        patched_process.NotionManager.return_value = notion_mock
+        patched_process.get_jd_text_cached.return_value = "JD Text"
+
+        await process_command(
+            jobs_folder=str(position_folder.parent),
+            notion_db_id=None,
+            notion_api_key=None,
+            gemini_api_key=None,
+            gemini_model=None,
+            gemini_temperature=None,
+            console=mock_console,
+        )
+
+        printed = [call.args[0] for call in patched_process.rprint.call_args_list if call.args]
+        assert any("No new CV files to process" in str(message) for message in printed)
+        patched_process.get_jd_text_cached.assert_called_once_with(
+            str(position_folder / "jd.pdf")
+        )
+        patched_process.extract_cv_text.assert_not_called()
+        patched_process.process_cvs.assert_not_called()
+        patched_process.format_processing_stats.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_process_command_reports_unreadable_cv(
+        self, patched_process, notion_mock, mock_console, position_folder
+    ):
+        """Test a CV without extracted text is listed as failed with its label intact."""
+        patched_process.get_config.return_value = MOCK_CONFIG
+        patched_process.NotionManager.return_value = notion_mock
+        patched_process.get_jd_text_cached.return_value = "JD Text"
+        for index in (1, 2):
+            (position_folder / CV_FOLDER_NAME / f"cv{index}.pdf").write_bytes(
+                f"CV {index}".encode()
             )
+        patched_process.extract_cv_text.return_value = MOCK_CV_DATA[:1]
+        patched_process.skip_known_duplicates.return_value = (MOCK_CV_DATA[:1], [])
+        patched_process.process_cvs.return_value = (1, 0, 0, ["cv1.pdf"], [], [])
 
-        # Verify calls
-        mock_get_config.assert_called_once_with(
-            "test_db", "test_key", "test_key", "test_model", 0.5, "Europe/London"
+        await process_command(
+            jobs_folder=str(position_folder.parent),
+            notion_db_id=None,
+            notion_api_key=None,
+            gemini_api_key=None,
+            gemini_model=None,
+            gemini_temperature=None,
+            console=mock_console,
         )
-        mock_verify_gemini.assert_called_once_with("test_key")
-        mock_gemini_client.assert_called_once_with(api_key="test_key")
 
-        # Verify NotionManager was initialized with timezone
-        mock_notion_manager.assert_called_once_with(
-            token="test_key", database_id="test_db", timezone="UTC"
+        patched_process.rprint.assert_any_call("- cv2.pdf \\[no text extracted]")
+        assert patched_process.format_processing_stats.call_args.kwargs["failed_files"] == 1
+
+    @pytest.mark.asyncio
+    async def test_process_command_skips_file_it_cannot_read(
+        self, patched_process, notion_mock, mock_console, position_folder, monkeypatch
+    ):
+        """Test a CV that cannot be read is reported as failed while the rest go on."""
+        patched_process.get_config.return_value = MOCK_CONFIG
+        patched_process.NotionManager.return_value = notion_mock
+        patched_process.get_jd_text_cached.return_value = "JD Text"
+        for index in (1, 2):
+            (position_folder / CV_FOLDER_NAME / f"cv{index}.pdf").write_bytes(
+                f"CV {index}".encode()
+            )
+
+        def load(file_path):
+            if file_path.endswith("cv2.pdf"):
+                raise PermissionError("Permission denied")
+            return hash_file(file_path)
+
+        monkeypatch.setattr("commands.process.hash_file", load)
+        patched_process.extract_cv_text.return_value = MOCK_CV_DATA[:1]
+        patched_process.skip_known_duplicates.return_value = (MOCK_CV_DATA[:1], [])
+        patched_process.process_cvs.return_value = (1, 0, 0, ["cv1.pdf"], [], [])
+
+        await process_command(
+            jobs_folder=str(position_folder.parent),
+            notion_db_id=None,
+            notion_api_key=None,
+            gemini_api_key=None,
+            gemini_model=None,
+            gemini_temperature=None,
+            console=mock_console,
         )
 
-        mock_extract_pdf.assert_called_once_with("test_jd.pdf")
-        mock_get_files.assert_called_once_with("test_folder")
-        mock_format_cv_files.assert_called_once()
-        mock_extract.assert_called_once()
-        mock_process.assert_called_once()
-        mock_upload.assert_called_once()
-        mock_format_stats.assert_called_once()
+        extracted = patched_process.extract_cv_text.await_args.args[0]
+        assert [cv_file["file_name"] for cv_file in extracted] == ["cv1.pdf"]
+        patched_process.rprint.assert_any_call("- cv2.pdf \\[unreadable file]")
+        assert patched_process.format_processing_stats.call_args.kwargs["failed_files"] == 1
 
     @pytest.mark.asyncio
-    @patch("commands.process.rprint")
-    async def test_process_command_missing_folder(self, mock_rprint):
-        """Test process command with missing CV folder."""
-        with pytest.raises(ValueError) as excinfo:
+    async def test_process_command_closes_clients_on_error(
+        self, patched_process, notion_mock, mock_console, position_folder
+    ):
+        """Test the Notion client is closed even when processing a position raises."""
+        patched_process.get_config.return_value = MOCK_CONFIG
+        patched_process.NotionManager.return_value = notion_mock
+        patched_process.get_jd_text_cached.return_value = "JD Text"
+        (position_folder / CV_FOLDER_NAME / "cv1.pdf").write_bytes(b"CV 1")
+        patched_process.extract_cv_text.return_value = MOCK_CV_DATA[:1]
+        patched_process.skip_known_duplicates.return_value = (MOCK_CV_DATA[:1], [])
+        patched_process.process_cvs.side_effect = RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
             await process_command(
-                cv_folder="nonexistent_folder",
-                jd_file="test.pdf",
+                jobs_folder=str(position_folder.parent),
                 notion_db_id=None,
                 notion_api_key=None,
                 gemini_api_key=None,
                 gemini_model=None,
                 gemini_temperature=None,
+                console=mock_console,
             )
 
-        assert "CV folder not found" in str(excinfo.value)
+        notion_mock.aclose.assert_awaited_once()
 
     @pytest.mark.asyncio
-    @patch("commands.process.get_cv_files")
-    @patch("commands.process.rprint")
-    @patch("os.path.exists")
-    @patch("os.listdir")
-    async def test_process_command_no_cv_files(
-        self, mock_listdir, mock_exists, mock_rprint, mock_get_files
+    async def test_process_command_closes_notion_when_setup_fails(
+        self, patched_process, notion_mock, mock_console, position_folder
     ):
-        """Test process command with no CV files."""
-        # Setup mocks
-        mock_exists.return_value = True
-        mock_listdir.return_value = ["file1.txt", "file2.jpg"]
-        mock_get_files.return_value = []
+        """Test the Notion connections are closed when loading existing candidates fails."""
+        patched_process.get_config.return_value = MOCK_CONFIG
+        patched_process.NotionManager.return_value = notion_mock
+        notion_mock.prefetch_existing_emails.side_effect = RuntimeError("boom")
 
         with pytest.raises(typer.Exit):
             await process_command(
-                cv_folder="test_folder",
-                jd_file="test.pdf",
+                jobs_folder=str(position_folder.parent),
                 notion_db_id=None,
                 notion_api_key=None,
                 gemini_api_key=None,
                 gemini_model=None,
                 gemini_temperature=None,
+                console=mock_console,
             )
 
-        mock_rprint.assert_called_with(
-            ANY
-        )  # Check if rprint was called with any argument
+        notion_mock.aclose.assert_awaited_once()
+        patched_process.extract_cv_text.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_process_command_logs_identical_files(
+        self, patched_process, notion_mock, mock_console, position_folder
+    ):
+        """Test byte- and text-identical copies of a CV are logged so later runs skip them."""
+        patched_process.get_config.return_value = MOCK_CONFIG
+        patched_process.NotionManager.return_value = notion_mock
+        patched_process.get_jd_text_cached.return_value = "JD Text"
+        for file_name in ("cv1.pdf", "cv1 copy.pdf"):
+            (position_folder / CV_FOLDER_NAME / file_name).write_bytes(b"CV 1")
+        # Different bytes, same text as cv1.pdf
+        (position_folder / CV_FOLDER_NAME / "cv1.docx").write_bytes(b"CV 1 as DOCX")
+        patched_process.extract_cv_text.side_effect = lambda cv_files, *args, **kwargs: [
+            {**cv_file, "text": "CV 1 Text"} for cv_file in cv_files
+        ]
+        patched_process.skip_known_duplicates.return_value = (MOCK_CV_DATA[:1], [])
+        patched_process.process_cvs.return_value = (1, 0, 0, ["cv1.pdf"], [], [])
+
+        await process_command(
+            jobs_folder=str(position_folder.parent),
+            notion_db_id=None,
+            notion_api_key=None,
+            gemini_api_key=None,
+            gemini_model=None,
+            gemini_temperature=None,
+            console=mock_console,
+        )
+
+        extracted = patched_process.extract_cv_text.await_args.args[0]
+        assert len(extracted) == 2
+        byte_identical = {"cv1.pdf", "cv1 copy.pdf"} - {
+            cv_file["file_name"] for cv_file in extracted
+        }
+        # drop_identical_texts keeps the first of the two files with the same text
+        text_identical = {extracted[1]["file_name"]}
+        assert load_processed_files(str(position_folder)) == byte_identical | text_identical
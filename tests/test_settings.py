@@ -2,68 +2,89 @@
 Tests for the settings module
 """
 
-import os
-import sys
-from unittest.mock import patch
-
+import pytest
+from pydantic import ValidationError
 from pydantic_settings import SettingsConfigDict
 
-# Add src directory to path
-sys.path.insert(
-    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+from config.settings import Settings
+
+# The real settings config minus the .env file, so frozen and the other options still apply
+NO_ENV_FILE_CONFIG = SettingsConfigDict({**Settings.model_config, "env_file": None})
+
+SETTINGS_ENV_VARS = (
+    "GEMINI_API_KEY",
+    "NOTION_API_KEY",
+    "NOTION_DATABASE_ID",
+    "GEMINI_MODEL",
+    "TEMPERATURE",
+    "TIMEZONE",
 )
 
-from config.settings import Settings
+
+@pytest.fixture(scope="module")
+def ignore_env_file():
+    """Stop Settings from reading a developer's .env file for the tests in this module."""
+    original_config = Settings.model_config
+    Settings.model_config = NO_ENV_FILE_CONFIG
+    yield
+    Settings.model_config = original_config
 
 
 class TestSettings:
     """Tests for settings."""
 
-    def test_settings_default_values(self):
-        """Test default values in settings."""
-        # We need to patch the Settings class's model_config to avoid loading from .env
-        with (
-            patch.object(
-                Settings, "model_config", SettingsConfigDict(env_ignore_env_file=True)
+    @pytest.mark.parametrize(
+        "env, expected",
+        [
+            pytest.param(
+                {},
+                {
+                    "GEMINI_API_KEY": "",
+                    "NOTION_API_KEY": "",
+                    "NOTION_DATABASE_ID": "",
+                    "GEMINI_MODEL": "gemini-2.0-flash",
+                    "TEMPERATURE": 0.0,
+                    "TIMEZONE": "UTC",
+                },
+                id="default_values",
             ),
-            patch.dict(os.environ, {}, clear=True),
-        ):
-            # Create settings with no environment variables
-            settings = Settings()
+            pytest.param(
+                {
+                    "GEMINI_API_KEY": "test_gemini_key",
+                    "NOTION_API_KEY": "test_notion_key",
+                    "NOTION_DATABASE_ID": "test_db_id",
+                    "GEMINI_MODEL": "custom_model",
+                    "TEMPERATURE": "0.8",
+                    "TIMEZONE": "Europe/Paris",
+                },
+                {
+                    "GEMINI_API_KEY": "test_gemini_key",
+                    "NOTION_API_KEY": "test_notion_key",
+                    "NOTION_DATABASE_ID": "test_db_id",
+                    "GEMINI_MODEL": "custom_model",
+                    "TEMPERATURE": 0.8,
+                    "TIMEZONE": "Europe/Paris",
+                },
+                id="from_env_variables",
+            ),
+        ],
+    )
+    def test_settings_values(self, ignore_env_file, monkeypatch, env, expected):
+        """Test settings fall back to defaults and load values from environment variables."""
+        for name in SETTINGS_ENV_VARS:
+            monkeypatch.delenv(name, raising=False)
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
 
-            # Check default values
-            assert settings.GEMINI_API_KEY == ""
-            assert settings.NOTION_API_KEY == ""
-            assert settings.NOTION_DATABASE_ID == ""
-            assert settings.GEMINI_MODEL == "gemini-2.0-flash"
-            assert settings.TEMPERATURE == 0.0
-            assert settings.TIMEZONE == "UTC"
+        settings = Settings()
 
-    def test_settings_from_env_variables(self):
-        """Test loading settings from environment variables."""
-        mock_env = {
-            "GEMINI_API_KEY": "test_gemini_key",
-            "NOTION_API_KEY": "test_notion_key",
-            "NOTION_DATABASE_ID": "test_db_id",
-            "GEMINI_MODEL": "custom_model",
-            "TEMPERATURE": "0.8",
-            "TIMEZONE": "Europe/Paris",
-        }
+        assert {name: getattr(settings, name) for name in expected} == expected
 
-        # We need to patch the Settings class's model_config to avoid loading from .env
-        with (
-            patch.object(
-                Settings, "model_config", SettingsConfigDict(env_ignore_env_file=True)
-            ),
-            patch.dict(os.environ, mock_env, clear=True),
-        ):
-            # Create settings with environment variables
-            settings = Settings()
+    def test_settings_are_frozen(self):
+        """Test the module-level settings cannot be changed after import."""
+        from config.settings import CONFIG, settings
 
-            # Check values loaded from environment
-            assert settings.GEMINI_API_KEY == "test_gemini_key"
-            assert settings.NOTION_API_KEY == "test_notion_key"
-            assert settings.NOTION_DATABASE_ID == "test_db_id"
-            assert settings.GEMINI_MODEL == "custom_model"
-            assert settings.TEMPERATURE == 0.8
-            assert settings.TIMEZONE == "Europe/Paris"
+        with pytest.raises(ValidationError):
+            settings.TIMEZONE = "Europe/Paris"
+        with pytest.raises(TypeError):
+            CONFIG["TIMEZONE"] = "Europe/Paris"
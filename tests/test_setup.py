@@ -2,15 +2,8 @@
 Tests for the setup command
 """
 
-import os
-import sys
 from unittest.mock import patch
 
-# Add src directory to path
-sys.path.insert(
-    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
-)
-
 from commands.setup import setup_command
 
 
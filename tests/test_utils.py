@@ -2,98 +2,73 @@
 Tests for utility functions
 """
 
-import os
-import sys
 
+import pytest
 from rich.panel import Panel
 
-# Add src directory to path
-sys.path.insert(
-    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
-)
-
-from misc.utils import format_processing_stats
+from misc.utils import format_processing_stats, sniff_email
 
 
 class TestUtils:
     """Tests for utility functions."""
 
-    def test_format_processing_stats_all_successful(self):
-        """Test formatting processing stats with all successful files."""
+    @pytest.mark.parametrize(
+        "total, processed, successful, duplicate, failed, expected",
+        [
+            pytest.param(
+                5, 5, 5, 0, 0,
+                ["5/5 files processed", "5 uploaded to Notion", "0 duplicates skipped", "0 failed"],
+                id="all_successful",
+            ),
+            pytest.param(
+                5, 5, 3, 2, 0,
+                ["5/5 files processed", "3 uploaded to Notion", "2 duplicates skipped", "0 failed"],
+                id="with_duplicates",
+            ),
+            pytest.param(
+                5, 5, 2, 1, 2,
+                ["5/5 files processed", "2 uploaded to Notion", "1 duplicates skipped", "2 failed"],
+                id="with_failures",
+            ),
+            pytest.param(
+                10, 5, 4, 1, 0,
+                [
+                    "5/10 files processed",
+                    "4 uploaded to Notion",
+                    "1 duplicates skipped",
+                    "0 failed",
+                    "5 files were not processed",
+                ],
+                id="partial_processing",
+            ),
+        ],
+    )
+    def test_format_processing_stats(
+        self, total, processed, successful, duplicate, failed, expected
+    ):
+        """Test formatting processing stats for different run outcomes."""
         result = format_processing_stats(
-            total_files=5,
-            processed_files=5,
-            successful_files=5,
-            duplicate_files=0,
-            failed_files=0,
+            total_files=total,
+            processed_files=processed,
+            successful_files=successful,
+            duplicate_files=duplicate,
+            failed_files=failed,
             notion_db_id="test-db-id",
         )
 
         # Assert the result is a Panel
         assert isinstance(result, Panel)
 
-        # Check for success indicators in the rendered text
         rendered = result.__str__()
         assert "Processing Complete" in rendered
-        assert "5/5 files processed" in rendered
-        assert "5 uploaded to Notion" in rendered
-        assert "0 duplicates skipped" in rendered
-        assert "0 failed" in rendered
-
-    def test_format_processing_stats_with_duplicates(self):
-        """Test formatting processing stats with duplicate files."""
-        result = format_processing_stats(
-            total_files=5,
-            processed_files=5,
-            successful_files=3,
-            duplicate_files=2,
-            failed_files=0,
-            notion_db_id="test-db-id",
-        )
+        for text in expected:
+            assert text in rendered
 
-        # Check for duplicate indicators in the rendered text
-        rendered = result.__str__()
-        assert "Processing Complete" in rendered
-        assert "5/5 files processed" in rendered
-        assert "3 uploaded to Notion" in rendered
-        assert "2 duplicates skipped" in rendered
-        assert "0 failed" in rendered
-
-    def test_format_processing_stats_with_failures(self):
-        """Test formatting processing stats with failed files."""
-        result = format_processing_stats(
-            total_files=5,
-            processed_files=5,
-            successful_files=2,
-            duplicate_files=1,
-            failed_files=2,
-            notion_db_id="test-db-id",
-        )
-
-        # Check for failure indicators in the rendered text
-        rendered = result.__str__()
-        assert "Processing Complete" in rendered
-        assert "5/5 files processed" in rendered
-        assert "2 uploaded to Notion" in rendered
-        assert "1 duplicates skipped" in rendered
-        assert "2 failed" in rendered
-
-    def test_format_processing_stats_partial_processing(self):
-        """Test formatting processing stats with partial processing."""
-        result = format_processing_stats(
-            total_files=10,
-            processed_files=5,
-            successful_files=4,
-            duplicate_files=1,
-            failed_files=0,
-            notion_db_id="test-db-id",
-        )
-
-        # Check for partial processing indicators in the rendered text
-        rendered = result.__str__()
-        assert "Processing Complete" in rendered
-        assert "5/10 files processed" in rendered
-        assert "4 uploaded to Notion" in rendered
-        assert "1 duplicates skipped" in rendered
-        assert "0 failed" in rendered
-        assert "5 files were not processed" in rendered
+    def test_sniff_email(self, sample_cv_text):
+        """Test finding the single email address in CV text."""
+        assert sniff_email(sample_cv_text) == "john.doe@example.com"
+        assert sniff_email("Contact: jane.doe+cv@mail.example.org.") == "jane.doe+cv@mail.example.org"
+        assert sniff_email("Jane@example.com, again jane@example.com") == "Jane@example.com"
+        assert sniff_email("No contact details") is None
+        # A referee's address makes the candidate's own one ambiguous
+        assert sniff_email("jane@example.com\nReferee: boss@corp.example") is None